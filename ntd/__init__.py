@@ -0,0 +1,27 @@
+"""Calculating actual vehicle revenue miles & hours, MR-20 and S-10 from the NTD input workbooks.
+
+The daily VRM, VRH, TVM and TVH tables are ServiceMatrix objects (a date x route float block
+with the calendar of each day). The stages can be run one by one, or all together with
+run_pipeline / run_stages.
+
+ntd.batch, ntd.store and ntd.benchmark are also command line tools (python -m ntd.batch, ...)
+and are imported on their own.
+"""
+
+from .cache import CACHE_FOLDER, read_excel_cached, StageCache, MemoryStageCache
+from .inputs import INPUT_FILES, INPUT_SCHEMAS, InputTables, read_inputs, read_input, read_table, normalize_inputs, route_list
+from .matrix import ServiceMatrix
+from .schedule import calendar_matrix, sched_table, build_calendar, sched_lookup, fill_sched_table
+from .deviations import (apply_atypical_days, run_deltas, apply_runs, apply_lost_runs, apply_added_runs,
+                         add_sched_deadhead, add_deadhead, apply_run_deadhead)
+from .reports import (ALL_ROUTES, VOMS_GROUPINGS, daily_voms, voms_peaks, rollup_cube, mr20_from_cube, mr20, service_change_voms_from_cube, service_change_voms,
+                      average_voms, s10_from_cube, s10)
+from .excel import table_rows, write_workbook, write_workbooks
+from .export import EXPORT_FORMATS, EXPORT_TABLES, export_table, export_tables
+from .instrument import PROFILE_FILE, table_size, StageProfiler
+from .validate import InputError, validate_inputs, check_inputs
+from .pipeline import INTERMEDIATE_FILES, OUTPUT_FILES, STAGES, PROFILE_STAGES, needed_stages, run_stages, output_workbooks, write_outputs, run_pipeline
+from .monthly import MR20_HISTORY_FILE, parse_month, month_inputs, update_mr20_history, run_month
+from .watch import snapshot, InputWatcher, watch
+from .cli import main
+from .synthetic import synthetic_inputs, write_inputs
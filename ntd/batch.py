@@ -0,0 +1,154 @@
+# Running the pipeline for many input folders (reporting years, agencies, modes) in parallel
+#
+# The manifest is a .csv, .json or .xlsx table with one row per run:
+# - input_folder (required): folder with the 0_ to 9_ input workbooks
+# - name (optional): name of the run, default is the name of the input folder
+# - output_folder (optional): default is <output root>/<name>
+# Any other column (e.g. agency, reporting year, mode) is copied to the summary.
+#
+#     python -m ntd.batch manifest.csv -o batch_output [-j 4]
+
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .pipeline import run_pipeline
+
+
+SUMMARY_FILE = 'batch_summary.xlsx'
+
+
+def read_manifest(path):
+    """Read a batch manifest into a DataFrame with name, input_folder and output_folder columns."""
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        df = pd.read_csv(path)
+    elif extension == '.json':
+        df = pd.read_json(path)
+    elif extension in ['.xlsx', '.xls']:
+        df = pd.read_excel(path)
+    else:
+        raise ValueError('Manifest must be a .csv, .json or .xlsx file: ' + path)
+
+    if 'input_folder' not in df.columns:
+        raise ValueError('Manifest has no input_folder column: ' + path)
+
+    # relative folders are relative to the manifest, an empty output_folder is <output root>/<name>
+    base = os.path.dirname(os.path.abspath(path))
+    df['input_folder'] = [os.path.join(base, folder) for folder in df['input_folder'].astype(str)]
+
+    if 'name' not in df.columns:
+        df['name'] = [os.path.basename(os.path.normpath(folder)) for folder in df['input_folder']]
+    df['name'] = df['name'].astype(str)
+    if df['name'].duplicated().any():
+        raise ValueError('Run names in the manifest must be unique: ' +
+                         ', '.join(sorted(set(df.loc[df['name'].duplicated(), 'name']))))
+
+    if 'output_folder' not in df.columns:
+        df['output_folder'] = None
+    df['output_folder'] = [os.path.join(base, folder) if isinstance(folder, str) and folder else None
+                           for folder in df['output_folder']]
+
+    return df
+
+
+def run_one(job):
+    """Run the pipeline for one manifest row (a dict) and return its summary row."""
+
+    summary = dict(job)
+    start = time.perf_counter()
+    try:
+        tables = run_pipeline(job['input_folder'], job['output_folder'],
+                              dump_intermediates = job.get('dump_intermediates', False),
+                              verbose = False, cache = job.get('cache', True))
+    except Exception as e: # one failed run should not stop the batch
+        summary.update(status = 'failed', error = '%s: %s' % (type(e).__name__, e),
+                       traceback = traceback.format_exc())
+    else:
+        summary.update(status = 'ok', error = '',
+                       routes = len(tables['routes']),
+                       days = len(tables['VRM']),
+                       UPT = tables['MR20']['UPT'].sum(),
+                       VRM = round(tables['VRM'].daily_total().sum(), 2),
+                       VRH = round(tables['VRH'].daily_total().sum(), 2),
+                       TVM = round(tables['TVM'].daily_total().sum(), 2),
+                       TVH = round(tables['TVH'].daily_total().sum(), 2),
+                       max_VOMS = tables['MR20']['VOM'].max())
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    summary.pop('dump_intermediates', None)
+    summary.pop('cache', None)
+
+    return summary
+
+
+def run_batch(manifest, output_root, workers = None, dump_intermediates = False, cache = True, verbose = True):
+    """Run every row of `manifest` (a path or a DataFrame from read_manifest) in a process pool.
+
+    Each run writes to its own output folder, <output_root>/<name> unless the manifest sets one.
+    The summary of all runs is written to <output_root>/batch_summary.xlsx and returned.
+    """
+
+    df_manifest = read_manifest(manifest) if isinstance(manifest, str) else manifest
+
+    jobs = []
+    for job in df_manifest.to_dict('records'):
+        if not isinstance(job['output_folder'], str) or not job['output_folder']:
+            job['output_folder'] = os.path.join(output_root, job['name'])
+        job['dump_intermediates'] = dump_intermediates
+        job['cache'] = cache
+        jobs.append(job)
+
+    ls_summary = []
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        for summary in executor.map(run_one, jobs):
+            if verbose:
+                print('  --', summary['name'], ':', summary['status'], summary['error'], '(%s s)' % summary['seconds'])
+            ls_summary.append(summary)
+
+    df_summary = pd.DataFrame(ls_summary).drop(columns = 'traceback', errors = 'ignore')
+    os.makedirs(output_root, exist_ok = True)
+    df_summary.to_excel(os.path.join(output_root, SUMMARY_FILE), index = False)
+
+    for summary in ls_summary: # full tracebacks of the failed runs
+        if summary['status'] != 'ok' and verbose:
+            print()
+            print('*', summary['name'], 'failed:')
+            print(summary['traceback'])
+
+    return df_summary
+
+
+def main(argv = None):
+    """Run a batch from the command line. Returns the process exit code (1 when a run failed)."""
+
+    parser = argparse.ArgumentParser(description = 'Run the NTD pipeline for every input folder of a manifest.')
+    parser.add_argument('manifest', help = '.csv, .json or .xlsx table with an input_folder column')
+    parser.add_argument('-o', '--output-root', default = 'batch_output',
+                        help = 'folder for the per-run output folders and the summary (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type = int, default = None,
+                        help = 'number of processes (default: number of cores)')
+    parser.add_argument('--dump-intermediates', action = 'store_true',
+                        help = 'also write the 101-110 intermediate workbooks')
+    parser.add_argument('--no-cache', action = 'store_true',
+                        help = 'parse every workbook and recompute every stage')
+    args = parser.parse_args(argv)
+
+    print('* Running', args.manifest, '...')
+    df_summary = run_batch(args.manifest, args.output_root, workers = args.workers,
+                           dump_intermediates = args.dump_intermediates, cache = not args.no_cache)
+    print()
+    print(df_summary)
+    print()
+    print(SUMMARY_FILE, 'is saved in', args.output_root)
+
+    return 0 if (df_summary['status'] == 'ok').all() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# Timing every stage on synthetic inputs of several sizes
+#
+# Every scale is generated with ntd.synthetic, run through the stages with a StageProfiler,
+# and the timings are added to a results CSV under a label (by default the hash of the ntd
+# source code), so the timings of two versions of the code can be compared:
+#
+#     python -m ntd.benchmark --label before
+#     ... change the code ...
+#     python -m ntd.benchmark --label after
+#     python -m ntd.benchmark --compare before after
+#
+# By default the inputs stay in memory. With --excel the workbooks are also written and
+# read back and the output workbooks are written, which dominates at the larger scales.
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from .cache import source_hash
+from .excel import write_workbooks
+from .inputs import read_inputs
+from .instrument import StageProfiler
+from .pipeline import run_stages, output_workbooks
+from .synthetic import synthetic_inputs, write_inputs
+
+
+RESULTS_FILE = 'ntd_benchmark.csv'
+
+# scales grow one dimension at a time from a LeeTran sized year
+BASE_SCALE = {'routes': 30, 'years': 1, 'service_changes_per_year': 5,
+              'lost_runs': 1000, 'added_runs': 300, 'atypical_days_per_year': 9}
+SCALES = {
+    'base': {},
+    'routes_150': {'routes': 150},
+    'routes_500': {'routes': 500},
+    'years_5': {'years': 5},
+    'years_10': {'years': 10},
+    'lost_runs_100k': {'lost_runs': 100000, 'added_runs': 30000},
+}
+
+
+def scale_inputs(scale, seed = 0):
+    """Synthetic inputs of a scale (a dict overriding BASE_SCALE)."""
+
+    scale = dict(BASE_SCALE, **scale)
+
+    return synthetic_inputs(routes = scale['routes'],
+                            service_changes = scale['service_changes_per_year'] * scale['years'],
+                            days = 365 * scale['years'],
+                            lost_runs = scale['lost_runs'], added_runs = scale['added_runs'],
+                            atypical_days = scale['atypical_days_per_year'] * scale['years'],
+                            seed = seed)
+
+
+def run_scale(scale, excel = False):
+    """Run every stage once on a scale and return the StageProfiler profile DataFrame."""
+
+    profiler = StageProfiler()
+    inputs = scale_inputs(scale)
+
+    if excel:
+        with tempfile.TemporaryDirectory() as folder:
+            profiler.run('write_inputs', write_inputs, inputs, folder, size_of = inputs)
+            inputs = profiler.run('read_inputs', read_inputs, folder)
+            tables = run_stages(inputs, verbose = False, profiler = profiler)
+            workbooks = output_workbooks(tables)
+            profiler.run('write_outputs', write_workbooks, workbooks, folder,
+                         size_of = [df for df, index, right_align in workbooks.values()])
+    else:
+        run_stages(inputs, verbose = False, profiler = profiler)
+
+    return profiler.to_frame()
+
+
+def run_benchmark(scales = None, repeat = 3, excel = False, label = None, results_file = RESULTS_FILE, verbose = True):
+    """Time every stage of `scales` (names of SCALES, default all) and add the timings to `results_file`.
+
+    The time of a stage is the best of `repeat` runs. Returns the new rows.
+    """
+
+    if label is None:
+        label = 'code-' + source_hash()[:10]
+    run_at = datetime.now().isoformat(timespec = 'seconds')
+
+    ls_results = []
+    for name in (scales or list(SCALES)):
+        scale = dict(BASE_SCALE, **SCALES[name])
+        df = pd.concat([run_scale(SCALES[name], excel) for i in range(repeat)])
+        df = df.groupby('stage', sort = False).agg(seconds = ('seconds', 'min'), max_rss_mb = ('max_rss_mb', 'max'),
+                                                   rows = ('rows', 'first'), cells = ('cells', 'first')).reset_index()
+        df.insert(0, 'scale', name)
+        for key in reversed(list(BASE_SCALE)):
+            df.insert(1, key, scale[key])
+        ls_results.append(df)
+        if verbose:
+            print('  --', name, ':', round(df['seconds'].sum(), 3), 's')
+
+    df_results = pd.concat(ls_results, ignore_index = True)
+    df_results.insert(0, 'label', label)
+    df_results.insert(1, 'run_at', run_at)
+    df_results.insert(2, 'excel', excel)
+    df_results.to_csv(results_file, mode = 'a', header = not os.path.exists(results_file), index = False)
+
+    return df_results
+
+
+def compare(labels, results_file = RESULTS_FILE):
+    """Seconds per scale and stage for every label (latest run of each), side by side."""
+
+    df = pd.read_csv(results_file)
+    df = df[df['label'].isin(labels)]
+    df = df[df['run_at'] == df.groupby(['label', 'excel'])['run_at'].transform('max')] # latest run of each label
+
+    df_compare = df.pivot_table(index = ['excel', 'scale', 'stage'], columns = 'label', values = 'seconds', sort = False)
+    df_compare = df_compare[[label for label in labels if label in df_compare.columns]]
+    if len(df_compare.columns) == 2:
+        df_compare['ratio'] = (df_compare.iloc[:, 1] / df_compare.iloc[:, 0]).round(2)
+
+    return df_compare
+
+
+def main(argv = None):
+    """Run or compare benchmarks from the command line. Returns the process exit code."""
+
+    parser = argparse.ArgumentParser(description = 'Time every NTD pipeline stage on synthetic inputs of several sizes.')
+    parser.add_argument('--scales', default = None,
+                        help = 'comma separated scales to run (default: all of %s)' % ', '.join(SCALES))
+    parser.add_argument('--repeat', type = int, default = 3, help = 'runs per scale, the best is kept (default: %(default)s)')
+    parser.add_argument('--excel', action = 'store_true',
+                        help = 'also write and read the input workbooks and write the output workbooks')
+    parser.add_argument('--label', default = None, help = 'name of the results (default: hash of the ntd source)')
+    parser.add_argument('--results-file', default = RESULTS_FILE, help = 'CSV the results are added to (default: %(default)s)')
+    parser.add_argument('--compare', nargs = '+', metavar = 'LABEL', default = None,
+                        help = 'print the stored results of these labels side by side instead of running')
+    args = parser.parse_args(argv)
+
+    pd.set_option('display.max_rows', None)
+    if args.compare is not None:
+        print(compare(args.compare, args.results_file))
+        return 0
+
+    scales = args.scales.split(',') if args.scales else None
+    unknown = set(scales or []) - set(SCALES)
+    if unknown:
+        parser.error('unknown scales: ' + ', '.join(sorted(unknown)))
+
+    print('* Benchmarking...')
+    df_results = run_benchmark(scales, repeat = args.repeat, excel = args.excel,
+                               label = args.label, results_file = args.results_file)
+    print()
+    print(df_results.pivot_table(index = 'stage', columns = 'scale', values = 'seconds', sort = False))
+    print()
+    print('Results are added to', args.results_file)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
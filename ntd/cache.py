@@ -0,0 +1,230 @@
+# Binary cache of the input workbooks and of the stage results
+#
+# Every workbook is converted to a Feather file (Pickle when pyarrow is not installed) on
+# its first read. Later reads use the cached copy as long as the workbook is unchanged:
+# same modification time and size, or else the same SHA-256 hash of the file content.
+# Every cache file is written to a temporary file of its own and then moved in place, so
+# processes sharing an input folder (batch runs, -j) never read or write a half written file.
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow # Feather needs pyarrow
+    CACHE_FORMAT = 'feather'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+
+# default cache folder, created inside the input folder
+CACHE_FOLDER = '.ntd_cache'
+
+
+def file_hash(path):
+    """SHA-256 of the file content."""
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+
+    return sha.hexdigest()
+
+
+def _write_atomically(path, write):
+    """Call write(temporary path) on a new file next to `path`, then move it to `path`.
+
+    Returns what `write` returns. The temporary file is removed when `write` fails.
+    """
+
+    fd, temp_path = tempfile.mkstemp(dir = os.path.dirname(path) or '.', prefix = os.path.basename(path) + '.',
+                                     suffix = '.tmp')
+    os.close(fd)
+    try:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask) # mkstemp makes the file private, the cache is shared like the workbooks
+        result = write(temp_path)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return result
+
+
+def _write_cache(df, data_path):
+
+    def write(temp_path):
+        if CACHE_FORMAT == 'feather':
+            try: # Feather needs string column names, the originals are restored on read
+                df.rename(columns = str).to_feather(temp_path)
+                return 'feather'
+            except (pyarrow.ArrowException, ValueError, TypeError): # e.g. columns with mixed types
+                pass
+        df.to_pickle(temp_path)
+        return 'pickle'
+
+    return _write_atomically(data_path, write)
+
+
+def _write_meta(meta, meta_path):
+
+    def write(temp_path):
+        with open(temp_path, 'w') as f:
+            json.dump(meta, f)
+
+    _write_atomically(meta_path, write)
+
+
+def _read_cache(data_path, meta):
+
+    if meta['format'] == 'feather':
+        df = pd.read_feather(data_path)
+        df.columns = [int(col) if is_int else col for col, is_int in zip(df.columns, meta['int_columns'])]
+        for col in df.columns[df.dtypes == object]: # Arrow gives None where read_excel gives NaN
+            df[col] = df[col].astype(object).where(df[col].notna(), np.nan)
+        return df
+
+    return pd.read_pickle(data_path)
+
+
+def read_excel_cached(path, cache_folder, reader = pd.read_excel, version = None):
+    """Read a workbook with reader(path), through the cache in `cache_folder`.
+
+    `version` describes what the reader returns (e.g. the columns it keeps); a copy cached
+    under another version is read again.
+    """
+
+    stat = os.stat(path) # a missing workbook fails before the cache folder is made
+    os.makedirs(cache_folder, exist_ok = True)
+    name = os.path.basename(path)
+    meta_path = os.path.join(cache_folder, name + '.json')
+    data_path = os.path.join(cache_folder, name + '.cache')
+
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(data_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+    if meta is not None and meta.get('version') != version: # cached by another reader
+        meta = None
+
+    if meta is not None:
+        if meta['mtime'] == stat.st_mtime and meta['size'] == stat.st_size: # unchanged workbook
+            return _read_cache(data_path, meta)
+
+        sha = file_hash(path)
+        if meta['sha256'] == sha: # touched but not changed, remember the new time
+            meta['mtime'], meta['size'] = stat.st_mtime, stat.st_size
+            _write_meta(meta, meta_path)
+            return _read_cache(data_path, meta)
+    else:
+        sha = file_hash(path)
+
+    # new or changed workbook
+    df = reader(path)
+
+    meta = {'source': name, 'version': version, 'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': sha,
+            'format': _write_cache(df, data_path),
+            'int_columns': [isinstance(col, int) for col in df.columns]}
+    _write_meta(meta, meta_path)
+
+    return df
+
+
+# Stage results
+#
+# Every stage result is saved under a key made of the content of the inputs it reads,
+# the keys of the stages it depends on and the ntd source code. A stage is only
+# recomputed when one of those changes, and the saved results of the stages that
+# completed before a failure are picked up by the next run.
+
+def table_hash(df):
+    """SHA-256 of the content, column names and dtypes of a DataFrame."""
+
+    sha = hashlib.sha256()
+    sha.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode())
+    sha.update(pd.util.hash_pandas_object(df, index = True).to_numpy().tobytes())
+
+    return sha.hexdigest()
+
+
+def source_hash():
+    """SHA-256 of the ntd source files, so results are recomputed after a code change."""
+
+    sha = hashlib.sha256()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sorted(os.listdir(folder)):
+        if file_name.endswith('.py'):
+            with open(os.path.join(folder, file_name), 'rb') as f:
+                sha.update(f.read())
+
+    return sha.hexdigest()
+
+
+class StageCache:
+    """Stage results saved as Pickle files in `folder`, one file per stage."""
+
+    def __init__(self, folder):
+
+        self.folder = folder
+        self.code = source_hash()
+        os.makedirs(folder, exist_ok = True)
+
+    def key(self, stage, input_hashes, upstream_keys):
+        """Key of a stage from the hashes of its inputs and the keys of its upstream stages."""
+
+        text = json.dumps([stage, self.code, input_hashes, upstream_keys])
+
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _path(self, stage):
+        return os.path.join(self.folder, stage + '.pkl')
+
+    def load(self, stage, key):
+        """Return the saved results of `stage`, or None when there are none for `key`."""
+
+        try:
+            saved_key, results = pd.read_pickle(self._path(stage))
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+        return results if saved_key == key else None
+
+    def save(self, stage, key, results):
+        """Save the results of `stage`, replacing the previous ones."""
+
+        _write_atomically(self._path(stage), lambda temp_path: pd.to_pickle((key, results), temp_path))
+
+
+class MemoryStageCache(StageCache):
+    """Stage results kept in memory by a long running process (see ntd.watch), the last results of every stage.
+
+    A stage loaded from it returns the same objects as before, so callers can tell the
+    tables that changed with `is`.
+    """
+
+    def __init__(self):
+
+        self.code = source_hash()
+        self.results = {}
+
+    def load(self, stage, key):
+        """Return the results of `stage`, or None when there are none for `key`."""
+
+        saved_key, results = self.results.get(stage, (None, None))
+
+        return results if saved_key == key else None
+
+    def save(self, stage, key, results):
+        """Keep the results of `stage`, replacing the previous ones."""
+
+        self.results[stage] = (key, results)
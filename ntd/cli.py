@@ -0,0 +1,93 @@
+# Command line entry point
+
+import argparse
+
+from .export import EXPORT_FORMATS
+from .pipeline import PROFILE_STAGES, run_pipeline
+from .monthly import run_month
+from .validate import InputError
+from .watch import watch
+
+
+def main(argv = None, default_folder = '.', pause = False):
+    """Run the pipeline from the command line. Returns the process exit code."""
+
+    parser = argparse.ArgumentParser(
+        description = 'Calculate actual vehicle revenue miles & hours, MR-20 and S-10 from the NTD input workbooks.')
+    parser.add_argument('input_folder', nargs = '?', default = default_folder,
+                        help = 'folder with the 0_ to 9_ input workbooks (default: %(default)s)')
+    parser.add_argument('-o', '--output-folder', default = None,
+                        help = 'folder for the output workbooks (default: the input folder)')
+    parser.add_argument('--dump-intermediates', action = 'store_true',
+                        help = 'also write the 101-110 intermediate workbooks')
+    parser.add_argument('-j', '--workers', type = int, default = 1,
+                        help = 'number of processes reading the input and writing the output workbooks (default: %(default)s)')
+    parser.add_argument('--single-workbook', default = None, metavar = 'FILE_NAME',
+                        help = 'write every output table as a sheet of this one workbook instead of one workbook each')
+    parser.add_argument('--profile', action = 'store_true',
+                        help = 'write the time, memory and size of every stage to ntd_profile.json/.csv in the output folder')
+    parser.add_argument('--profile-stage', default = None, metavar = 'STAGE', choices = PROFILE_STAGES,
+                        help = 'also save the cProfile statistics of this stage as STAGE.prof, one of: ' + ', '.join(PROFILE_STAGES))
+    parser.add_argument('--trace-memory', action = 'store_true',
+                        help = 'add the tracemalloc peak of every stage to the profile (slows the run down)')
+    parser.add_argument('--fact-store', default = None, metavar = 'SQLITE_FILE',
+                        help = 'also save the daily route facts to this SQLite file (see python -m ntd.store)')
+    parser.add_argument('--dataset', default = None,
+                        help = 'name of the facts in the fact store (default: the name of the input folder)')
+    parser.add_argument('--export', nargs = '+', choices = EXPORT_FORMATS, default = None, metavar = 'FORMAT',
+                        help = 'also write the daily service, rollup, MR-20 and S-10 tables as %s files to <output_folder>/arrow'
+                               % ' and / or '.join(EXPORT_FORMATS))
+    parser.add_argument('--no-validate', action = 'store_true',
+                        help = 'skip the check of the input tables before the stages run')
+    parser.add_argument('--no-cache', action = 'store_true',
+                        help = 'always parse the input workbooks and recompute every stage instead of using the cache in <input_folder>/.ntd_cache')
+    parser.add_argument('--month', default = None,
+                        help = 'only compute the MR-20 of this month (YYYY-MM) and add it to MR-20 History.xlsx')
+    parser.add_argument('--watch', action = 'store_true',
+                        help = 'keep running: rerun the stages affected by every saved change of an input workbook and rewrite the changed outputs')
+    parser.add_argument('--pause', action = 'store_true', default = pause,
+                        help = 'wait for Enter before exiting')
+    args = parser.parse_args(argv)
+    if args.watch and args.month is not None:
+        parser.error('--watch and --month cannot be used together')
+
+    # options of a full run, and those --watch and --month also take
+    run_options = {'--dump-intermediates': args.dump_intermediates, '--single-workbook': args.single_workbook is not None,
+                   '--profile': args.profile, '--profile-stage': args.profile_stage is not None,
+                   '--trace-memory': args.trace_memory, '--fact-store': args.fact_store is not None,
+                   '--dataset': args.dataset is not None, '--export': args.export is not None}
+    for mode, used, kept in [('--watch', args.watch, ['--dump-intermediates', '--export']),
+                             ('--month', args.month is not None, [])]:
+        unsupported = [option for option, given in run_options.items() if used and given and option not in kept]
+        if unsupported:
+            parser.error('%s cannot be used with %s' % (mode, ', '.join(unsupported)))
+
+    exit_code = 0
+    try:
+        if args.watch:
+            watch(args.input_folder, args.output_folder, dump_intermediates = args.dump_intermediates,
+                  validate = not args.no_validate, cache = not args.no_cache, workers = args.workers, export = args.export)
+        elif args.month is not None:
+            run_month(args.input_folder, args.month, args.output_folder, cache = not args.no_cache,
+                      validate = not args.no_validate, workers = args.workers)
+        else:
+            run_pipeline(args.input_folder, args.output_folder, dump_intermediates = args.dump_intermediates,
+                         cache = not args.no_cache, workers = args.workers, single_workbook = args.single_workbook,
+                         profile = args.profile, profile_stage = args.profile_stage, trace_memory = args.trace_memory,
+                         validate = not args.no_validate, fact_store = args.fact_store, dataset = args.dataset,
+                         export = args.export)
+    except InputError as e: # the report is the useful part, not the traceback
+        print()
+        print(e)
+        exit_code = 1
+    except ValueError as e: # a --month that is not YYYY-MM or outside every service change
+        if args.month is None:
+            raise
+        print()
+        print(e)
+        exit_code = 1
+
+    if args.pause:
+        input("Press Enter to continue...")
+
+    return exit_code
@@ -0,0 +1,103 @@
+# Actual service: atypical days, lost / added runs and deadhead
+#
+# Atypical days
+# - Service miles and hours on an atypical day is first removed from the scheduled miles and hours
+# - If service miles and hours occured on an atypical day, the service should be recorded only in 8_Added Runs table
+# - All the atypical days should not be used in calculating average daily service
+#
+# Added and Lost Runs
+# - Record added miles and hours using positive numbers
+# - Record lost miles and hours using negative numbers
+# - Added and lost runs are originated from the daily logs of LeeTran Operation Department
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .schedule import sched_lookup
+
+
+def apply_atypical_days(VRM, VRH, df_atypical):
+    """Zero the miles/hours of atypical days and mark them 'Atypical'. Returns (VRM, VRH).
+
+    Atypical dates outside every service change window are left out with a warning.
+    """
+
+    atypical_dates = pd.DatetimeIndex(df_atypical['Date'])
+
+    outside = ~atypical_dates.isin(VRM.dates)
+    if outside.any(): # not in the calendar, nothing to remove
+        warnings.warn('%d atypical days outside every service change window: %s'
+                      % (outside.sum(), ', '.join(atypical_dates[outside].strftime('%Y-%m-%d'))))
+
+    day = VRM.dates.isin(atypical_dates) # VRM and VRH share the calendar
+    service_type = VRM.service_type.copy()
+    service_type[day] = 'Atypical'
+
+    VRM = VRM.copy(values = np.where(day[:, None], 0, VRM.values), service_type = service_type)
+    VRH = VRH.copy(values = np.where(day[:, None], 0, VRH.values), service_type = service_type.copy())
+
+    return VRM, VRH
+
+
+def run_deltas(df_runs, value_column, dates, ls_route_str):
+    """Sum `value_column` of the run records into a date x route matrix aligned to `dates`.
+
+    Records of routes which are not in `ls_route_str` are left out with a warning.
+    """
+
+    df = df_runs[['Date', 'Route', value_column]].rename(columns = {value_column: 'Value'})
+
+    unknown = ~df['Route'].isin(ls_route_str)
+    if unknown.any(): # report instead of creating new route columns
+        warnings.warn('%d "%s" records skipped, routes not in the route list: %s'
+                      % (unknown.sum(), value_column, ', '.join(sorted(set(df.loc[unknown, 'Route'])))))
+        df = df.loc[~unknown]
+
+    # one cell per (date, route), dates without a calendar row drop out in the reindex
+    df_delta = df.groupby(['Date', 'Route'])['Value'].sum().unstack('Route')
+    df_delta = df_delta.reindex(index = dates, columns = ls_route_str).fillna(0)
+
+    return df_delta
+
+
+def apply_runs(matrix, df_runs, value_column):
+    """Add `value_column` of every run record to the route/date cell of a service matrix."""
+
+    df_delta = run_deltas(df_runs, value_column, matrix.dates, matrix.routes)
+
+    return matrix.copy(values = matrix.values + df_delta.to_numpy(dtype = matrix.values.dtype))
+
+
+def apply_lost_runs(VRM, VRH, df_lost_run):
+    """Reduce the lost runs (negative miles/hours) from VRM and VRH. Returns (VRM, VRH)."""
+
+    return apply_runs(VRM, df_lost_run, "Miles"), apply_runs(VRH, df_lost_run, "Hours")
+
+
+def apply_added_runs(VRM, VRH, df_added_run):
+    """Add the added runs to VRM and VRH. Returns (VRM, VRH)."""
+
+    return apply_runs(VRM, df_added_run, "Miles"), apply_runs(VRH, df_added_run, "Hours")
+
+
+def add_sched_deadhead(matrix, df_deadhead):
+    """Add the scheduled deadhead (5_/6_ tables) to every typical day of a service matrix."""
+
+    deadhead = sched_lookup(matrix, df_deadhead) # deadhead of every day and route
+    typical = np.asarray(matrix.service_type != 'Atypical') # atypical days keep their miles/hours
+
+    return matrix.copy(values = np.where(typical[:, None], matrix.values + deadhead, matrix.values))
+
+
+def add_deadhead(VRM, VRH, df_DHM, df_DHH):
+    """Add the scheduled deadhead to typical days. Returns (TVM, TVH)."""
+
+    return add_sched_deadhead(VRM, df_DHM), add_sched_deadhead(VRH, df_DHH)
+
+
+def apply_run_deadhead(TVM, TVH, df_runs):
+    """Add the deadhead of added or lost runs to TVM and TVH. Returns (TVM, TVH)."""
+
+    return apply_runs(TVM, df_runs, "Deadhead Miles"), apply_runs(TVH, df_runs, "Deadhead Hours")
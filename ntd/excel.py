@@ -0,0 +1,111 @@
+# Writing the output workbooks
+#
+# The workbooks are streamed row by row with openpyxl's write-only mode, so memory does not
+# grow with the workbook model, and alignment is set on the cells directly instead of going
+# through a pandas Styler. The layout is the one of DataFrame.to_excel: a header row, then
+# one row per record, with the index in the first column when it is written.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment
+
+
+# Excel limit on sheet names
+MAX_SHEET_NAME = 31
+
+RIGHT = Alignment(horizontal = 'right')
+
+# cells converted to Python values at a time
+CHUNK_CELLS = 20000
+
+
+def _column_values(values):
+    """Python values of a column, None for missing values and text for periods."""
+
+    values = pd.Series(values)
+    if isinstance(values.dtype, pd.PeriodDtype):
+        values = values.astype(str)
+    values = values.astype(object).where(values.notna(), None)
+
+    return [value.item() if isinstance(value, np.generic) else value for value in values]
+
+
+def table_rows(df, index = True):
+    """Header row and record rows of `df` as lists of Python values.
+
+    The records are converted a chunk of about CHUNK_CELLS cells at a time, so memory does
+    not grow with the size of the table.
+    """
+
+    header = list(df.columns)
+    if index:
+        header.insert(0, df.index.name)
+    yield header
+
+    chunk_rows = max(1, CHUNK_CELLS // max(1, df.shape[1]))
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        columns = [_column_values(chunk.iloc[:, i]) for i in range(chunk.shape[1])]
+        if index:
+            columns.insert(0, _column_values(chunk.index))
+        yield from (list(row) for row in zip(*columns))
+
+
+def write_workbook(path, sheets):
+    """Write `sheets`, a list of (sheet name, DataFrame, index, right_align), as one workbook at `path`.
+
+    With right_align the record cells (not the header or the index) are aligned to the right.
+    """
+
+    wb = Workbook(write_only = True)
+    for sheet_name, df, index, right_align in sheets:
+        ws = wb.create_sheet(sheet_name[:MAX_SHEET_NAME])
+        rows = table_rows(df, index)
+        ws.append(next(rows))
+        first = 1 if index else 0
+        for row in rows:
+            if right_align:
+                row[first:] = [_right_cell(ws, value) for value in row[first:]]
+            ws.append(row)
+    wb.save(path)
+
+    return path
+
+
+def _right_cell(ws, value):
+    cell = WriteOnlyCell(ws, value = value)
+    cell.alignment = RIGHT
+    return cell
+
+
+def _write_one(job):
+    return write_workbook(*job)
+
+
+def write_workbooks(workbooks, output_folder, workers = 1, single_workbook = None):
+    """Write `workbooks`, a dict {file name: (DataFrame, index, right_align)}, to `output_folder`.
+
+    With `workers` > 1 the workbooks are written in parallel processes. With `single_workbook`
+    (a file name) every table is written as a sheet of that one workbook instead, named after
+    its file. Returns the paths written.
+    """
+
+    os.makedirs(output_folder, exist_ok = True)
+
+    if single_workbook is not None:
+        sheets = [(os.path.splitext(file_name)[0], df, index, right_align)
+                  for file_name, (df, index, right_align) in workbooks.items()]
+        return [write_workbook(os.path.join(output_folder, single_workbook), sheets)]
+
+    jobs = [(os.path.join(output_folder, file_name), [('Sheet1', df, index, right_align)])
+            for file_name, (df, index, right_align) in workbooks.items()]
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            return list(executor.map(_write_one, jobs))
+
+    return [_write_one(job) for job in jobs]
@@ -0,0 +1,164 @@
+# Arrow (Feather) and Parquet export of the results, for BI tools
+#
+# The tables are long, so their schema is the same whatever the routes, service changes and
+# months of a run: dates are dates, route, service type and day of week are dictionary
+# (categorical) columns, and the values are float64. The column names are those of the fact
+# store (see ntd.store). The Feather files are uncompressed Arrow IPC, which can be memory
+# mapped (pyarrow.ipc.open_file(pyarrow.memory_map(path)), or Power BI / Tableau Arrow readers)
+# instead of parsed; the Parquet files are compressed and smaller.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa # only needed to export
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+EXPORT_FORMATS = ['feather', 'parquet']
+EXPORT_FOLDER = 'arrow'
+SCHEMA_VERSION = '1' # stored in the metadata of every file, raised when a schema changes
+
+# the service matrices of the daily table, by column name
+DAILY_MATRICES = {'vrm': 'VRM', 'vrh': 'VRH', 'tvm': 'TVM', 'tvh': 'TVH', 'sched_vrm': 'atypical_VRM'}
+
+
+def _schemas():
+
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+
+    return {
+        'service_daily': pa.schema([('date', pa.date32()), ('day_of_week', dictionary), ('service_type', dictionary),
+                                    ('service_change_id', pa.int64()), ('route', dictionary)]
+                                   + [(col, pa.float64()) for col in DAILY_MATRICES]),
+        'route_month_rollup': pa.schema([('route', dictionary), ('month', pa.date32()), ('service_change_id', pa.int64()),
+                                         ('service_type', dictionary), ('metric', dictionary), ('days', pa.int64()),
+                                         ('sum', pa.float64()), ('max', pa.float64())]),
+        'mr20': pa.schema([('month', pa.date32()), ('upt', pa.float64()), ('vrm', pa.float64()),
+                           ('vrh', pa.float64()), ('voms', pa.float64())]),
+        's10': pa.schema([('item', dictionary), ('service_type', dictionary), ('value', pa.float64())]),
+    }
+
+
+def _dictionary(codes, categories):
+    return pa.DictionaryArray.from_arrays(pa.array(np.asarray(codes, dtype = np.int32), mask = np.asarray(codes) < 0),
+                                          pa.array(list(categories), type = pa.string()))
+
+
+def _categorical(values): # categories in order of appearance, e.g. the route order
+    values = pd.Categorical(values, categories = pd.unique(values.dropna()))
+    return _dictionary(values.codes, values.categories.astype(str))
+
+
+def _month(year_month):
+    return pa.array(pd.PeriodIndex(year_month, freq = 'M').to_timestamp().date, type = pa.date32())
+
+
+def _float(values):
+    return pa.array(pd.to_numeric(pd.Series(values), errors = 'coerce').to_numpy(dtype = float), from_pandas = True)
+
+
+def service_daily(tables):
+    """The daily service matrices as one long table: one row per date and route."""
+
+    VRM = tables['VRM']
+    days, routes = VRM.values.shape
+    day_of_week = pd.Categorical(VRM.day_of_week)
+    service_type = pd.Categorical(VRM.service_type)
+    service_change_id = pd.array(np.asarray(VRM.service_change_id, dtype = float), dtype = 'Int64')
+
+    columns = {'date': pa.array(np.repeat(VRM.dates.values.astype('datetime64[D]'), routes), type = pa.date32()),
+               'day_of_week': _dictionary(np.repeat(day_of_week.codes, routes), day_of_week.categories),
+               'service_type': _dictionary(np.repeat(service_type.codes, routes), service_type.categories),
+               'service_change_id': pa.array(service_change_id.repeat(routes), type = pa.int64(), from_pandas = True),
+               'route': _dictionary(np.tile(np.arange(routes), days), VRM.routes)}
+    for col, name in DAILY_MATRICES.items():
+        columns[col] = pa.array(tables[name].values.ravel(), type = pa.float64()) # no copy of the float values
+
+    return columns
+
+
+def route_month_rollup(tables):
+    """The rollup cube, with the month as a date."""
+
+    cube = tables['cube']
+
+    return {'route': _categorical(cube['route']),
+            'month': _month(cube['year_month']),
+            'service_change_id': pa.array(cube['service_change_id'], type = pa.int64(), from_pandas = True),
+            'service_type': _categorical(cube['service_type']),
+            'metric': _categorical(cube['metric']),
+            'days': pa.array(cube['days'], type = pa.int64()),
+            'sum': _float(cube['sum']),
+            'max': _float(cube['max'])}
+
+
+def mr20(tables):
+    """MR-20, one row per month."""
+
+    MR20 = tables['MR20']
+
+    return {'month': _month(MR20['year_month']),
+            'upt': _float(MR20['UPT']),
+            'vrm': _float(MR20['VRM']),
+            'vrh': _float(MR20['VRH']),
+            'voms': _float(MR20['VOM'])}
+
+
+def s10(tables):
+    """S-10 as one row per item and service type, 'N/A' values are null."""
+
+    S10 = tables['S10']
+    service_types = S10.loc['Service Type'] # first row of the S-10 table
+    df = S10.drop(index = 'Service Type')
+    items, columns = df.shape
+
+    return {'item': _dictionary(np.repeat(np.arange(items), columns), df.index.astype(str)),
+            'service_type': _dictionary(np.tile(np.arange(columns), items), service_types.astype(str)),
+            'value': _float(df.to_numpy().ravel())}
+
+
+EXPORT_TABLES = {'service_daily': service_daily, 'route_month_rollup': route_month_rollup, 'mr20': mr20, 's10': s10}
+
+# the tables of run_stages the export reads
+EXPORT_SOURCES = list(DAILY_MATRICES.values()) + ['cube', 'MR20', 'S10']
+
+
+def export_table(tables, name):
+    """The pyarrow Table `name` of EXPORT_TABLES, with its fixed schema."""
+
+    if pa is None:
+        raise ImportError('Exporting to Feather / Parquet needs pyarrow (pip install pyarrow)')
+
+    schema = _schemas()[name].with_metadata({'ntd_schema_version': SCHEMA_VERSION, 'ntd_table': name})
+
+    return pa.Table.from_pydict(EXPORT_TABLES[name](tables), schema = schema)
+
+
+def export_tables(tables, output_folder, formats = EXPORT_FORMATS):
+    """Write the daily service, rollup, MR-20 and S-10 tables of run_stages to `output_folder`/arrow.
+
+    `formats` are 'feather' and / or 'parquet'. Returns the {name: pyarrow Table} written.
+    """
+
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError('Unknown export formats: ' + ', '.join(sorted(unknown)))
+
+    folder = os.path.join(output_folder, EXPORT_FOLDER)
+    os.makedirs(folder, exist_ok = True)
+
+    exported = {}
+    for name in EXPORT_TABLES:
+        table = exported[name] = export_table(tables, name)
+        if 'feather' in formats: # uncompressed, so readers can memory map it
+            feather.write_feather(table, os.path.join(folder, name + '.feather'), compression = 'uncompressed')
+        if 'parquet' in formats:
+            pq.write_table(table, os.path.join(folder, name + '.parquet'))
+
+    return exported
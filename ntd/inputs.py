@@ -0,0 +1,180 @@
+# Reading the NTD input workbooks
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .cache import read_excel_cached
+
+
+# input workbooks, keyed by the name used throughout the pipeline
+INPUT_FILES = {
+    'voms': '0_VOMs.xlsx',                           # Vehicles Operated at Maximum Service
+    'ridership': '1_Daily Ridership by Route.xlsx',  # Daily Ridership by Route
+    'service_change': '2_Service Changes.xlsx',      # Service Change table
+    'sched_miles': '3_Scheduled Miles.xlsx',         # Scheduled Miles
+    'sched_hours': '4_Scheduled Hours.xlsx',         # Scheduled Hours
+    'deadhead_miles': '5_Deadhead Vehicle Miles.xlsx',  # deadhead miles
+    'deadhead_hours': '6_Deadhead Vehicle Hours.xlsx',  # deadhead hours
+    'atypical': '7_Atypical Days.xlsx',              # atypical days
+    'added_runs': '8_Added Runs.xlsx',               # Added Runs
+    'lost_runs': '9_Lost Runs.xlsx',                 # Lost Runs
+}
+
+# columns of the input tables which are not routes
+NON_ROUTE_COLUMNS = ['Service Type', 'Month', 'Date', 'Total', 'Service Change ID', 'Day of Week']
+
+# stands for the route columns in INPUT_SCHEMAS: every column which is not in NON_ROUTE_COLUMNS
+ROUTES = 'routes'
+
+# the columns read from every workbook and their type; the other columns are not read.
+# 'date' is parsed and normalized to midnight, 'int' stays float when a value is missing or
+# fractional, 'route' is a route name written like the route headers (5.0 is '5'), and values
+# that do not convert are left empty for validate_inputs to report
+RUN_SCHEMA = {'Date': 'date', 'Route': 'route', 'Hours': 'float', 'Miles': 'float',
+              'Deadhead Hours': 'float', 'Deadhead Miles': 'float'}
+SCHEDULE_SCHEMA = {'Service Change ID': 'int', 'Day of Week': 'str', ROUTES: 'float'}
+INPUT_SCHEMAS = {
+    'voms': {'Service Type': 'str', 'Date': 'date', ROUTES: 'int'},
+    'ridership': {'Service Type': 'str', 'Date': 'date', 'Total': 'int', ROUTES: 'float'},
+    'service_change': {'Service Change ID': 'int', 'Change Date': 'date', 'End Date': 'date'},
+    'sched_miles': SCHEDULE_SCHEMA,
+    'sched_hours': SCHEDULE_SCHEMA,
+    'deadhead_miles': SCHEDULE_SCHEMA,
+    'deadhead_hours': SCHEDULE_SCHEMA,
+    'atypical': {'Date': 'date'},
+    'added_runs': RUN_SCHEMA,
+    'lost_runs': RUN_SCHEMA,
+}
+
+
+class InputTables(dict):
+    """The input tables, keyed like INPUT_FILES and also readable as attributes (inputs.ridership)."""
+
+    voms: pd.DataFrame
+    ridership: pd.DataFrame
+    service_change: pd.DataFrame
+    sched_miles: pd.DataFrame
+    sched_hours: pd.DataFrame
+    deadhead_miles: pd.DataFrame
+    deadhead_hours: pd.DataFrame
+    atypical: pd.DataFrame
+    added_runs: pd.DataFrame
+    lost_runs: pd.DataFrame
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _is_route(col):
+    return col not in NON_ROUTE_COLUMNS and not col.startswith('Unnamed') # 'Unnamed: 5' is a column without header
+
+
+def _route_name(value):
+    return str(int(value)) if isinstance(value, float) and value.is_integer() else value
+
+
+def _convert(values, kind):
+    """A column converted to the type of INPUT_SCHEMAS, or a 2D array of route values for ROUTES."""
+
+    if kind == 'date':
+        return pd.to_datetime(values, errors = 'coerce').dt.normalize()
+    if kind == 'str':
+        return values.astype('str')
+    if kind == 'route': # a numeric column read with an empty cell is float
+        return values.map(_route_name).astype('str')
+
+    if isinstance(values, pd.DataFrame): # the route columns, converted as one block
+        if not all(pd.api.types.is_numeric_dtype(dtype) for dtype in values.dtypes):
+            values = values.apply(pd.to_numeric, errors = 'coerce')
+        values = values.to_numpy(dtype = float)
+    else:
+        values = pd.to_numeric(values, errors = 'coerce').to_numpy(dtype = float)
+    if kind == 'int' and not np.isnan(values).any() and (values % 1 == 0).all():
+        values = values.astype(np.int64)
+
+    return values
+
+
+def normalize_table(name, df):
+    """Keep the columns of INPUT_SCHEMAS[name] converted to their type, with string headers.
+
+    Declared columns missing from `df` are left out (validate_inputs reports them).
+    """
+
+    schema = INPUT_SCHEMAS[name]
+    df = df.rename(columns = str)
+    columns = {col: _convert(df[col], kind) for col, kind in schema.items() if col in df.columns}
+    df_table = pd.DataFrame(columns, index = df.index)
+
+    if ROUTES in schema:
+        ls_route_str = [col for col in df.columns if _is_route(col)]
+        df_table = pd.concat([df_table, pd.DataFrame(_convert(df[ls_route_str], schema[ROUTES]),
+                                                     columns = ls_route_str, index = df.index)], axis = 1)
+
+    return df_table
+
+
+def normalize_inputs(inputs):
+    """Normalize every table of an InputTables bundle (see normalize_table)."""
+
+    return InputTables((name, normalize_table(name, df)) for name, df in inputs.items())
+
+
+def read_table(path, name):
+    """Read the columns of INPUT_SCHEMAS[name] from a workbook, normalized (see normalize_table)."""
+
+    schema = INPUT_SCHEMAS[name]
+    if ROUTES in schema:
+        usecols = lambda col: str(col) in schema or _is_route(str(col))
+    else:
+        usecols = lambda col: str(col) in schema
+
+    return normalize_table(name, pd.read_excel(path, usecols = usecols))
+
+
+def read_input(folder, name, cache_folder = None):
+    """Read the input workbook `name` (a key of INPUT_FILES) of `folder`, through the cache in `cache_folder`."""
+
+    path = os.path.join(folder, INPUT_FILES[name])
+    if cache_folder is None:
+        return read_table(path, name)
+
+    return read_excel_cached(path, cache_folder, reader = lambda path: read_table(path, name),
+                             version = json.dumps(INPUT_SCHEMAS[name]))
+
+
+def _read_one(job):
+    return read_input(*job)
+
+
+def read_inputs(folder, cache_folder = None, workers = 1):
+    """Read every input workbook in `folder` into an InputTables bundle.
+
+    Only the columns of INPUT_SCHEMAS are read, already converted to their type: the dates
+    are datetimes, the route headers are strings and the route values one float (or int) block.
+    With `cache_folder` the workbooks are read through the binary cache (see ntd.cache).
+    With `workers` > 1 the workbooks are parsed in parallel processes, so reading takes
+    about as long as the largest workbook.
+    """
+
+    jobs = [(folder, name, cache_folder) for name in INPUT_FILES]
+    if workers is None or workers > 1:
+        with ProcessPoolExecutor(max_workers = workers) as executor:
+            tables = list(executor.map(_read_one, jobs))
+    else:
+        tables = [_read_one(job) for job in jobs]
+
+    return InputTables(zip(INPUT_FILES, tables))
+
+
+def route_list(df_ridership):
+    """Return the routes of the ridership table as strings, in column order."""
+
+    return [str(col) for col in df_ridership.columns if col not in NON_ROUTE_COLUMNS]
@@ -0,0 +1,170 @@
+# Timing, memory and size of every stage
+#
+# The profile of a run lists, for every stage: the wall time, the peak resident memory of the
+# process so far (RSS, the peak working set on Windows) and the rows and cells of the tables
+# it produced. The peak memory allocated by Python during each stage (tracemalloc) is
+# optional, tracing every allocation makes the Excel stages several times slower. Work done
+# in worker processes (-j) only shows up in the wall time.
+
+import cProfile
+import ctypes
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from .matrix import ServiceMatrix
+
+try:
+    import resource # not on Windows
+except ImportError:
+    resource = None
+
+try:
+    import psutil # optional, only used on Windows
+except ImportError:
+    psutil = None
+
+
+PROFILE_FILE = 'ntd_profile'
+
+
+def table_size(results):
+    """(rows, cells) of the DataFrames, ServiceMatrix objects and pyarrow Tables in `results`, nested in dicts, lists or tuples."""
+
+    if isinstance(results, ServiceMatrix):
+        return len(results), results.values.size
+    if isinstance(results, pd.DataFrame):
+        return len(results), results.size
+    if hasattr(results, 'num_rows') and hasattr(results, 'num_columns'): # pyarrow Table
+        return results.num_rows, results.num_rows * results.num_columns
+    if isinstance(results, dict):
+        results = list(results.values())
+    if isinstance(results, (list, tuple)):
+        sizes = [table_size(result) for result in results]
+        return sum(size[0] for size in sizes), sum(size[1] for size in sizes)
+
+    return 0, 0
+
+
+class _ProcessMemoryCounters(ctypes.Structure): # PROCESS_MEMORY_COUNTERS of the Windows API
+    _fields_ = [('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong),
+                ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+
+def _windows_peak_rss():
+    """Peak working set of the process in bytes, None if it cannot be read."""
+
+    if psutil is not None:
+        return psutil.Process().memory_info().peak_wset
+    try:
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.WinDLL('kernel32')
+        kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+        psapi = ctypes.WinDLL('psapi')
+        psapi.GetProcessMemoryInfo.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ProcessMemoryCounters), ctypes.c_ulong]
+        if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+    except (AttributeError, OSError):
+        return None
+
+    return counters.PeakWorkingSetSize
+
+
+def max_rss_mb():
+    """Peak resident memory of the process in MB (peak working set on Windows), None where it is not available."""
+
+    if resource is None:
+        rss = _windows_peak_rss() if os.name == 'nt' else None
+        return None if rss is None else round(rss / 1024 ** 2, 1)
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return round(rss / 1024 ** 2 if os.uname().sysname == 'Darwin' else rss / 1024, 1) # bytes on macOS, KB on Linux
+
+
+class StageProfiler:
+    """Records the profile of every stage run through `run`.
+
+    With `trace_memory` the peak memory allocated during every stage is traced with tracemalloc.
+    With `profile_stage` the stage of that name is also run under cProfile, and its
+    statistics are saved as <profile_stage>.prof by `write`.
+    """
+
+    def __init__(self, profile_stage = None, trace_memory = False):
+
+        self.profile_stage = profile_stage
+        self.trace_memory = trace_memory
+        self.records = []
+        self.stats = None
+
+    def run(self, stage, function, *args, size_of = None):
+        """Call function(*args) as `stage` and return its result.
+
+        Rows and cells are counted on the result, or on `size_of` when it is given.
+        """
+
+        if self.trace_memory:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        profiler = cProfile.Profile() if stage == self.profile_stage else None
+        start = time.perf_counter()
+        if profiler is not None:
+            result = profiler.runcall(function, *args)
+            self.stats = profiler
+        else:
+            result = function(*args)
+        seconds = time.perf_counter() - start
+
+        peak_traced_mb = None
+        if self.trace_memory:
+            peak_traced_mb = round((tracemalloc.get_traced_memory()[1] - traced_before) / 1024 ** 2, 2)
+            if started_tracing:
+                tracemalloc.stop()
+
+        rows, cells = table_size(result if size_of is None else size_of)
+        self.records.append({'stage': stage, 'cached': False, 'seconds': round(seconds, 4),
+                             'peak_traced_mb': peak_traced_mb, 'max_rss_mb': max_rss_mb(),
+                             'rows': rows, 'cells': cells})
+
+        return result
+
+    def note(self, **fields):
+        """Add `fields` (e.g. cached = True) to the record of the last stage."""
+
+        self.records[-1].update(fields)
+
+    def to_frame(self):
+        """The profile as a DataFrame, one row per stage."""
+
+        return pd.DataFrame(self.records, columns = ['stage', 'cached', 'seconds', 'peak_traced_mb', 'max_rss_mb', 'rows', 'cells'])
+
+    def write(self, folder, **info):
+        """Write ntd_profile.json and ntd_profile.csv (and the cProfile statistics) to `folder`.
+
+        `info` (e.g. the input folder) is added to the JSON file. Returns the profile DataFrame.
+        """
+
+        os.makedirs(folder, exist_ok = True)
+        df = self.to_frame()
+        df.to_csv(os.path.join(folder, PROFILE_FILE + '.csv'), index = False)
+
+        profile = dict(info, created = datetime.now().isoformat(timespec = 'seconds'),
+                       total_seconds = round(df['seconds'].sum(), 4), stages = self.records)
+        with open(os.path.join(folder, PROFILE_FILE + '.json'), 'w') as f:
+            json.dump(profile, f, indent = 2)
+
+        if self.stats is not None:
+            self.stats.dump_stats(os.path.join(folder, self.profile_stage + '.prof'))
+
+        return df
@@ -0,0 +1,88 @@
+# Date x route service matrix used for VRM, VRH, TVM and TVH
+
+import numpy as np
+import pandas as pd
+
+
+# categories of the calendar information
+DAYS_OF_WEEK = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SERVICE_TYPES = ['Weekday', 'Saturday', 'Sunday', 'Atypical']
+
+
+class ServiceMatrix:
+    """Daily service of every route, with the calendar information of each day.
+
+    - dates: DatetimeIndex, one row per day
+    - routes: list of route names (strings), one column per route
+    - values: days x routes float array of miles or hours
+    - day_of_week, service_type, service_change_id: categoricals with one entry per day
+    """
+
+    def __init__(self, dates, routes, values, day_of_week, service_type, service_change_id):
+
+        self.dates = pd.DatetimeIndex(dates)
+        self.routes = list(routes)
+        self.values = np.asarray(values)
+        self.day_of_week = pd.Categorical(day_of_week)
+        self.service_type = pd.Categorical(service_type)
+        self.service_change_id = pd.Categorical(service_change_id)
+
+        if self.values.shape != (len(self.dates), len(self.routes)):
+            raise ValueError('values must have one row per date and one column per route, got %s for %d dates and %d routes'
+                             % (self.values.shape, len(self.dates), len(self.routes)))
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __repr__(self):
+        return '<ServiceMatrix %d days x %d routes, %s to %s>' % (
+            len(self.dates), len(self.routes),
+            self.dates.min().date() if len(self.dates) else None,
+            self.dates.max().date() if len(self.dates) else None)
+
+    def copy(self, values = None, service_type = None):
+        """Return a copy, optionally with new values and/or service types."""
+
+        return ServiceMatrix(self.dates, self.routes,
+                             self.values.copy() if values is None else values,
+                             self.day_of_week,
+                             self.service_type.copy() if service_type is None else service_type,
+                             self.service_change_id)
+
+    def daily_total(self):
+        """System total of every day (sum of the routes) as a Series indexed by date."""
+
+        return pd.Series(self.values.sum(axis = 1), index = self.dates)
+
+    def calendar(self):
+        """The calendar information as a DataFrame indexed by date."""
+
+        return pd.DataFrame({'Day of Week': self.day_of_week,
+                             'Service Type': self.service_type,
+                             'Service Change ID': self.service_change_id}, index = self.dates)
+
+    def to_frame(self):
+        """The wide table of the output workbooks: Date, Day of Week, Service Type, routes, Service Change ID."""
+
+        df = pd.DataFrame({'Date': self.dates.strftime('%Y-%m-%d'),
+                           'Day of Week': np.asarray(self.day_of_week),
+                           'Service Type': np.asarray(self.service_type)})
+        df = pd.concat([df, pd.DataFrame(self.values, columns = self.routes)], axis = 1)
+        df['Service Change ID'] = np.asarray(self.service_change_id)
+
+        return df
+
+    @classmethod
+    def from_frame(cls, df, ls_route_str = None):
+        """Build a matrix from a wide table such as 10_Actual Vehicle Revenue Miles.xlsx."""
+
+        df = df.rename(columns = {col: str(col) for col in df.columns})
+        if ls_route_str is None: # every column which is not calendar information is a route
+            ls_route_str = [col for col in df.columns
+                            if col not in ['Date', 'Day of Week', 'Service Type', 'Service Change ID']
+                            and not col.startswith('Unnamed')]
+
+        return cls(pd.to_datetime(df['Date']), ls_route_str, df[ls_route_str].to_numpy(dtype = float),
+                   pd.Categorical(df['Day of Week'], categories = DAYS_OF_WEEK),
+                   pd.Categorical(df['Service Type'], categories = SERVICE_TYPES),
+                   df['Service Change ID'])
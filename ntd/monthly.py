@@ -0,0 +1,111 @@
+# Monthly MR-20: one month of the calendar, deviations, ridership and VOMS
+#
+# The inputs are cut down to the target month before the stages run, so closing a month
+# does not recompute the months before it. The MR-20 row of the month is added to (or
+# replaces the previous version in) the MR-20 history workbook of the output folder.
+
+import os
+
+import pandas as pd
+
+from .cache import CACHE_FOLDER
+from .inputs import InputTables, read_inputs
+from .pipeline import run_stages
+from .validate import check_inputs
+
+
+MR20_HISTORY_FILE = 'MR-20 History.xlsx'
+
+# input tables with one row per date, cut to the month on their Date column
+DATED_INPUTS = ['voms', 'ridership', 'atypical', 'added_runs', 'lost_runs']
+
+
+def parse_month(month):
+    """The pd.Period of a 'YYYY-MM' string (or pd.Period), ValueError for anything else."""
+
+    try:
+        return pd.Period(month, freq = 'M')
+    except (ValueError, TypeError):
+        raise ValueError('Month must be given as YYYY-MM, e.g. 2022-09, not %r' % (month,)) from None
+
+
+def month_inputs(inputs, month):
+    """Return the inputs of one month (a 'YYYY-MM' string or pd.Period).
+
+    The dated tables keep the rows of the month and those without a date, the service changes
+    are clipped to the month.
+    The schedule and deadhead tables are per service change and are kept whole.
+    """
+
+    month = parse_month(month)
+    first_day, last_day = month.start_time.normalize(), month.end_time.normalize()
+
+    sliced = InputTables(inputs)
+    for name in DATED_INPUTS: # rows without a date are kept, so check_inputs reports them as in a full run
+        df = inputs[name]
+        sliced[name] = df[(df['Date'].dt.to_period('M') == month) | df['Date'].isna()].reset_index(drop = True)
+
+    df_sc = inputs['service_change']
+    df_sc = df_sc[(df_sc['Change Date'] <= last_day) & (df_sc['End Date'] >= first_day)]
+    if df_sc.empty:
+        raise ValueError('No service change in 2_Service Changes.xlsx covers ' + str(month))
+    sliced['service_change'] = df_sc.assign(**{'Change Date': df_sc['Change Date'].clip(lower = first_day),
+                                               'End Date': df_sc['End Date'].clip(upper = last_day)}).reset_index(drop = True)
+
+    return sliced
+
+
+def update_mr20_history(df_month, path):
+    """Add the MR-20 rows of `df_month` to the history workbook at `path`, replacing the same months.
+
+    Returns the whole history, sorted by month.
+    """
+
+    df_month = df_month.assign(year_month = df_month['year_month'].astype(str))
+    if os.path.exists(path):
+        df_history = pd.read_excel(path, dtype = {'year_month': str})
+        df_history = df_history[~df_history['year_month'].isin(df_month['year_month'])]
+        df_history = pd.concat([df_history, df_month], ignore_index = True)
+    else:
+        df_history = df_month
+
+    df_history = df_history.sort_values('year_month').reset_index(drop = True)
+    df_history.to_excel(path, index = False)
+
+    return df_history
+
+
+def run_month(input_folder, month, output_folder = None, verbose = True, cache = False, validate = True, workers = 1):
+    """Compute the MR-20 row of `month` and add it to the MR-20 history of `output_folder`.
+
+    Outputs go to `output_folder` (default: the input folder). `workers` processes read the
+    inputs. With `cache` the inputs are read through the binary cache in `input_folder`/.ntd_cache.
+    With `validate` the inputs of the month are checked first (see ntd.validate). A month that
+    is not YYYY-MM or that no service change covers raises ValueError. Returns the MR-20 history.
+    """
+
+    if output_folder is None:
+        output_folder = input_folder
+    month = parse_month(month) # before the workbooks are read
+
+    if verbose:
+        print('* Importing input tables...')
+    cache_folder = os.path.join(input_folder, CACHE_FOLDER) if cache else None
+    inputs = month_inputs(read_inputs(input_folder, cache_folder, workers), month)
+    if validate:
+        check_inputs(inputs)
+
+    # the stage cache holds the full year results, the month is small enough to recompute;
+    # MR-20 needs neither the deadhead stages nor TVM / TVH
+    tables = run_stages(inputs, verbose = verbose, targets = ['mr20'])
+
+    os.makedirs(output_folder, exist_ok = True)
+    df_history = update_mr20_history(tables['MR20'], os.path.join(output_folder, MR20_HISTORY_FILE))
+
+    if verbose:
+        print()
+        print(df_history)
+        print()
+        print(MR20_HISTORY_FILE, 'is saved in', output_folder)
+
+    return df_history
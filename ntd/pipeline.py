@@ -0,0 +1,351 @@
+# Running the stages from the input workbooks to MR-20 and S-10
+
+import hashlib
+import os
+
+import pandas as pd
+
+from .cache import CACHE_FOLDER, StageCache, table_hash
+from .inputs import read_inputs, route_list
+from .schedule import build_calendar, fill_sched_table
+from .deviations import (apply_atypical_days, apply_lost_runs, apply_added_runs,
+                         add_deadhead, apply_run_deadhead)
+from .reports import daily_voms, rollup_cube, mr20_from_cube, service_change_voms_from_cube, s10_from_cube
+from .excel import write_workbooks
+from .export import EXPORT_FOLDER, export_tables
+from .instrument import StageProfiler
+from .validate import check_inputs
+
+
+# intermediate tables, only written with dump_intermediates
+INTERMEDIATE_FILES = {
+    'sched_VRM': '101_Sched_VRM.xlsx',
+    'sched_VRH': '102_Sched_VRH.xlsx',
+    'atypical_VRM': '103_Sched_VRM_atypical_removed.xlsx',
+    'atypical_VRH': '104_Sched_VRH_atypical_removed.xlsx',
+    'lost_VRM': '105_Sched_VRM_lost_removed.xlsx',
+    'lost_VRH': '106_Sched_VRH_lost_removed.xlsx',
+    'deadhead_TVM': '107_Total_Vehicle_Miles_deadhead_added.xlsx',
+    'deadhead_TVH': '108_Total_Vehicle_Hours_deadhead_added.xlsx',
+    'added_dh_TVM': '109_Total_Vehicle_Miles_add_Added_Run_DH.xlsx',
+    'added_dh_TVH': '110_Total_Vehicle_Hours_add_Added_Run_DH.xlsx',
+}
+
+# final tables, always written
+OUTPUT_FILES = {
+    'VRM': '10_Actual Vehicle Revenue Miles.xlsx',
+    'VRH': '11_Actual Vehicle Revenue Hours.xlsx',
+    'TVM': '12_Actual Total Vehicle Miles.xlsx',
+    'TVH': '13_Actual Total Vehicle Hours.xlsx',
+    'service_change_VOMS': '14_Service Changes VOMS.xlsx',
+    'cube': '15_Route Month Rollup.xlsx',
+    'MR20': 'MR-20.xlsx',
+    'S10': 'S-10.xlsx',
+}
+
+
+def _calendar(inputs, tables):
+    return {'calendar': build_calendar(inputs['service_change'], tables['routes'])}
+
+def _schedule(inputs, tables):
+    return {'sched_VRM': fill_sched_table(tables['calendar'], inputs['sched_miles']),
+            'sched_VRH': fill_sched_table(tables['calendar'], inputs['sched_hours'])}
+
+def _atypical(inputs, tables):
+    return dict(zip(['atypical_VRM', 'atypical_VRH'],
+                    apply_atypical_days(tables['sched_VRM'], tables['sched_VRH'], inputs['atypical'])))
+
+def _lost_runs(inputs, tables):
+    return dict(zip(['lost_VRM', 'lost_VRH'],
+                    apply_lost_runs(tables['atypical_VRM'], tables['atypical_VRH'], inputs['lost_runs'])))
+
+def _added_runs(inputs, tables):
+    return dict(zip(['VRM', 'VRH'],
+                    apply_added_runs(tables['lost_VRM'], tables['lost_VRH'], inputs['added_runs'])))
+
+def _deadhead(inputs, tables):
+    return dict(zip(['deadhead_TVM', 'deadhead_TVH'],
+                    add_deadhead(tables['VRM'], tables['VRH'], inputs['deadhead_miles'], inputs['deadhead_hours'])))
+
+def _run_deadhead(inputs, tables):
+    TVM, TVH = apply_run_deadhead(tables['deadhead_TVM'], tables['deadhead_TVH'], inputs['added_runs'])
+    results = {'added_dh_TVM': TVM, 'added_dh_TVH': TVH}
+    results['TVM'], results['TVH'] = apply_run_deadhead(TVM, TVH, inputs['lost_runs'])
+    return results
+
+def _voms(inputs, tables):
+    return {'daily_VOMS': daily_voms(inputs['voms'], tables['routes'], inputs['service_change'])}
+
+def _revenue_cube(inputs, tables):
+    return {'revenue_cube': rollup_cube(tables['routes'], {'VRM': tables['VRM'], 'VRH': tables['VRH']})}
+
+def _total_cube(inputs, tables):
+    return {'total_cube': rollup_cube(tables['routes'], {'TVM': tables['TVM'], 'TVH': tables['TVH']})}
+
+def _sched_cube(inputs, tables):
+    return {'sched_cube': rollup_cube(tables['routes'], {'Sched VRM': tables['atypical_VRM']})}
+
+def _upt_cube(inputs, tables):
+    return {'upt_cube': rollup_cube(tables['routes'], df_ridership = inputs['ridership'],
+                                    df_service_change = inputs['service_change'])}
+
+def _voms_cube(inputs, tables):
+    return {'voms_cube': rollup_cube(tables['routes'], VOMS = tables['daily_VOMS'])}
+
+def _concat(tables, names):
+    return pd.concat([tables[name] for name in names], ignore_index = True)
+
+def _cube(inputs, tables):
+    return {'cube': _concat(tables, ['revenue_cube', 'total_cube', 'sched_cube', 'upt_cube', 'voms_cube'])}
+
+def _mr20(inputs, tables):
+    return {'MR20': mr20_from_cube(_concat(tables, ['revenue_cube', 'upt_cube', 'voms_cube']))}
+
+def _service_change_voms(inputs, tables):
+    return {'service_change_VOMS': service_change_voms_from_cube(tables['voms_cube'], inputs['service_change'])}
+
+def _s10(inputs, tables):
+    return {'S10': s10_from_cube(_concat(tables, ['revenue_cube', 'total_cube', 'sched_cube', 'upt_cube']),
+                                 tables['service_change_VOMS'])}
+
+
+# (stage, message, inputs it reads, stages it depends on, function), in running order
+STAGES = [
+    ('calendar', '* Creating Scheduled Vehicle Revenue Miles / Hours templates...',
+     ['service_change', 'routes'], [], _calendar),
+    ('schedule', '* Updating Vehicle Revenue Miles / Hours templates...',
+     ['sched_miles', 'sched_hours'], ['calendar'], _schedule),
+    ('atypical', '* Removing atypical day miles and hours...',
+     ['atypical'], ['schedule'], _atypical),
+    ('lost_runs', '* Reducing "Lost Runs"...',
+     ['lost_runs'], ['atypical'], _lost_runs),
+    ('added_runs', '* Adding "Added Runs"...',
+     ['added_runs'], ['lost_runs'], _added_runs),
+    ('deadhead', '* Producing Actual Total Vehicle Miles and Hours tables...',
+     ['deadhead_miles', 'deadhead_hours'], ['added_runs'], _deadhead),
+    ('run_deadhead', "* Processing deadhead miles and hours from 'Added Runs' and Lost Runs' ...",
+     ['added_runs', 'lost_runs'], ['deadhead'], _run_deadhead),
+    ('voms', '* Building the daily VOMS...',
+     ['voms', 'service_change', 'routes'], [], _voms),
+    ('revenue_cube', '* Rolling up actual revenue miles and hours by route, month and service type...',
+     ['routes'], ['added_runs'], _revenue_cube),
+    ('total_cube', '* Rolling up actual total miles and hours by route, month and service type...',
+     ['routes'], ['run_deadhead'], _total_cube),
+    ('sched_cube', '* Rolling up scheduled revenue miles by route, month and service type...',
+     ['routes'], ['atypical'], _sched_cube),
+    ('upt_cube', '* Rolling up ridership by route, month and service type...',
+     ['ridership', 'service_change', 'routes'], [], _upt_cube),
+    ('voms_cube', '* Rolling up VOMS by route, month and service type...',
+     ['routes'], ['voms'], _voms_cube),
+    ('cube', '* Rolling up routes x months x service types...',
+     [], ['revenue_cube', 'total_cube', 'sched_cube', 'upt_cube', 'voms_cube'], _cube),
+    ('mr20', '* Calculating MR-20...',
+     [], ['revenue_cube', 'upt_cube', 'voms_cube'], _mr20),
+    ('service_change_voms', '* Calculating service change VOMS...',
+     ['service_change'], ['voms_cube'], _service_change_voms),
+    ('s10', '* Calculating S-10...',
+     [], ['revenue_cube', 'total_cube', 'sched_cube', 'upt_cube', 'service_change_voms'], _s10),
+]
+
+# the stages run_pipeline can profile, see StageProfiler
+PROFILE_STAGES = (['read_inputs', 'validate'] + [stage for stage, message, stage_inputs, upstream, function in STAGES]
+                  + ['write_outputs', 'export', 'save_facts'])
+
+
+def needed_stages(targets):
+    """Names of the `targets` stages and of every stage they depend on, in running order."""
+
+    upstream_of = {stage: upstream for stage, message, stage_inputs, upstream, function in STAGES}
+    needed = set()
+    todo = list(targets)
+    while todo:
+        stage = todo.pop()
+        if stage not in needed:
+            needed.add(stage)
+            todo.extend(upstream_of[stage])
+
+    return [stage for stage, message, stage_inputs, upstream, function in STAGES if stage in needed]
+
+
+def run_stages(inputs, verbose = True, stage_cache = None, targets = None, profiler = None):
+    """Run every stage on the input tables (see read_inputs) and return a dict of result tables.
+
+    VRM, VRH, TVM, TVH, daily_VOMS and the 101-110 intermediate tables are ServiceMatrix objects,
+    the rollup cube (and its revenue, total, sched, upt and voms parts), MR20, S10 and
+    service_change_VOMS are DataFrames. With a StageCache, a stage whose inputs and upstream
+    stages are unchanged since the last run is loaded instead of computed.
+    With `targets` (stage names) only those stages and the ones they depend on are run.
+    With a StageProfiler, the time, memory and size of every stage are recorded.
+    """
+
+    def log(*args):
+        if verbose:
+            print(*args)
+
+    ls_route_str = route_list(inputs['ridership'])
+    log('List of routes:', ls_route_str)
+
+    for index, row in inputs['service_change'].iterrows():
+        log('  -- start date / end date for Service Change', row['Service Change ID'], ':',
+            row['Change Date'].strftime("%Y-%m-%d"), '/', row['End Date'].strftime("%Y-%m-%d"))
+
+    tables = {'routes': ls_route_str}
+
+    if stage_cache is not None: # what every stage reads, to tell which ones changed
+        input_hashes = {name: table_hash(df) for name, df in inputs.items()}
+        input_hashes['routes'] = hashlib.sha256(repr(ls_route_str).encode()).hexdigest()
+    stage_keys = {}
+    run = needed_stages(targets) if targets is not None else [stage[0] for stage in STAGES]
+
+    def load_or_compute(stage, stage_inputs, upstream, function):
+        """Results of the stage and whether they were loaded from the stage cache."""
+
+        if stage_cache is not None:
+            stage_keys[stage] = stage_cache.key(stage, [input_hashes[name] for name in stage_inputs],
+                                                [stage_keys[name] for name in upstream])
+            results = stage_cache.load(stage, stage_keys[stage])
+            if results is not None:
+                log('  -- unchanged, using the saved results')
+                return results, True
+
+        results = function(inputs, tables)
+        if stage_cache is not None: # checkpoint, a later failure does not lose this stage
+            stage_cache.save(stage, stage_keys[stage], results)
+
+        return results, False
+
+    for stage, message, stage_inputs, upstream, function in STAGES:
+        if stage not in run:
+            continue
+        log(message)
+
+        if profiler is None:
+            results, cached = load_or_compute(stage, stage_inputs, upstream, function)
+        else:
+            results, cached = profiler.run(stage, load_or_compute, stage, stage_inputs, upstream, function)
+            profiler.note(cached = cached)
+
+        tables.update(results)
+
+    return tables
+
+
+def output_workbooks(tables, dump_intermediates = False, names = None):
+    """The workbooks to write, {file name: (DataFrame, index, right_align)}, see ntd.excel.
+
+    With `names` (table names), only the workbooks of those tables.
+    """
+
+    def wanted(name):
+        return names is None or name in names
+
+    workbooks = {}
+    if dump_intermediates:
+        for name, file_name in INTERMEDIATE_FILES.items():
+            if wanted(name):
+                workbooks[file_name] = (tables[name].to_frame(), True, False)
+
+    for name in ['VRM', 'VRH', 'TVM', 'TVH']:
+        if wanted(name):
+            workbooks[OUTPUT_FILES[name]] = (tables[name].to_frame(), True, False)
+
+    for name in ['service_change_VOMS', 'cube', 'MR20', 'S10']:
+        if wanted(name):
+            workbooks[OUTPUT_FILES[name]] = (tables[name], name == 'S10', name == 'S10') # S-10 values aligned to the right
+
+    return workbooks
+
+
+def write_outputs(tables, output_folder, dump_intermediates = False, workers = 1, single_workbook = None):
+    """Write the final tables (and optionally the 101-110 intermediate tables) to `output_folder`.
+
+    With `workers` > 1 the workbooks are written in parallel processes, with `single_workbook`
+    (a file name) they are written as the sheets of one workbook.
+    """
+
+    return write_workbooks(output_workbooks(tables, dump_intermediates), output_folder,
+                           workers = workers, single_workbook = single_workbook)
+
+
+def run_pipeline(input_folder, output_folder = None, dump_intermediates = False, verbose = True, cache = False,
+                 workers = 1, single_workbook = None, profile = False, profile_stage = None,
+                 trace_memory = False, validate = True, fact_store = None, dataset = None, export = None):
+    """Read the inputs of `input_folder`, run every stage and write the outputs.
+
+    Outputs go to `output_folder` (default: the input folder). `workers` processes read the
+    inputs and write the outputs, see write_outputs for `single_workbook`. With `cache` the
+    inputs are read through the binary cache in `input_folder`/.ntd_cache, and the stage results
+    saved there are reused for the stages whose inputs did not change. With `profile` the time,
+    memory and size of every stage are written to ntd_profile.json/.csv in the output folder,
+    `profile_stage` also saves the cProfile statistics of that stage and `trace_memory` adds the
+    tracemalloc peak of every stage (see ntd.instrument). With `validate` the inputs are
+    checked before any stage runs and InputError lists every problem found (see ntd.validate).
+    With `fact_store` (a SQLite file) the daily facts are also saved there as `dataset`
+    (default: the name of the input folder), see ntd.store. `export` ('feather' and / or 'parquet')
+    also writes the daily service, rollup, MR-20 and S-10 tables to `output_folder`/arrow for BI
+    tools, see ntd.export. Returns the dict of result tables.
+    """
+
+    if output_folder is None:
+        output_folder = input_folder
+    if profile_stage is not None and profile_stage not in PROFILE_STAGES:
+        raise ValueError('Unknown stage %r, the stages are: %s' % (profile_stage, ', '.join(PROFILE_STAGES)))
+
+    profiler = None
+    if profile or profile_stage is not None or trace_memory:
+        profiler = StageProfiler(profile_stage, trace_memory = trace_memory)
+    def measure(stage, function, *args, size_of = None):
+        if profiler is None:
+            return function(*args)
+        return profiler.run(stage, function, *args, size_of = size_of)
+
+    if verbose:
+        print('* Importing input tables...')
+    cache_folder = os.path.join(input_folder, CACHE_FOLDER) if cache else None
+    inputs = measure('read_inputs', read_inputs, input_folder, cache_folder, workers)
+    if validate:
+        measure('validate', check_inputs, inputs, size_of = inputs)
+
+    stage_cache = StageCache(os.path.join(cache_folder, 'stages')) if cache else None
+    tables = run_stages(inputs, verbose = verbose, stage_cache = stage_cache, profiler = profiler)
+
+    if verbose:
+        print('* Exporting output tables to', output_folder, '...')
+    workbooks = output_workbooks(tables, dump_intermediates)
+    measure('write_outputs', write_workbooks, workbooks, output_folder, workers, single_workbook,
+            size_of = [df for df, index, right_align in workbooks.values()])
+
+    if export:
+        if verbose:
+            print('* Exporting', ' and '.join(export), 'tables to', os.path.join(output_folder, EXPORT_FOLDER), '...')
+        measure('export', export_tables, tables, output_folder, export)
+
+    if fact_store is not None:
+        # imported here, so python -m ntd.store does not find it loaded already
+        from .store import FACT_INPUTS, FACT_TABLES, save_facts
+        if dataset is None:
+            dataset = os.path.basename(os.path.normpath(os.path.abspath(input_folder)))
+        if verbose:
+            print('* Saving the daily facts to', fact_store, 'as', repr(dataset), '...')
+        measure('save_facts', save_facts, fact_store, tables, inputs, dataset,
+                size_of = [tables[name] for name in FACT_TABLES] + [inputs[name] for name in FACT_INPUTS])
+
+    if profiler is not None:
+        df_profile = profiler.write(output_folder, input_folder = os.path.abspath(input_folder),
+                                    routes = len(tables['routes']), days = len(tables['VRM']))
+        if verbose:
+            print()
+            print(df_profile)
+
+    if verbose:
+        print()
+        print(tables['MR20'])
+        print()
+        print(tables['S10'])
+        print()
+        if single_workbook is None:
+            print('MR-20.xlsx and S-10.xlsx are saved in the folder.')
+        else:
+            print(single_workbook, 'is saved in the folder.')
+
+    return tables
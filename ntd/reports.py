@@ -0,0 +1,336 @@
+# NTD forms: MR-20 (monthly) and S-10 (annual)
+#
+# Both are computed from the rollup cube: the days, sum and maximum of every metric by route,
+# month, service change and service type, with the system total as the route 'All'.
+#
+# The VOMS table is turned once per run into the daily VOMS matrix (daily_voms). The cube takes
+# its VOMS from it, and voms_peaks gives its peaks over any other grouping of the days.
+
+import numpy as np
+import pandas as pd
+
+from .matrix import ServiceMatrix
+
+
+# service types of the S-10 columns, in the order they are written
+S10_COLUMNS = {'Weekday': 'Average Weekday Schedule',
+               'Saturday': 'Average Saturday Schedule',
+               'Sunday': 'Average Sunday Schedule',
+               'Atypical': 'Average Atypical Schedule',
+               'Annual': 'Annual Total'}
+
+# route of the system totals in the rollup cube
+ALL_ROUTES = 'All'
+
+CUBE_COLUMNS = ['route', 'year_month', 'service_change_id', 'service_type', 'metric', 'days', 'sum', 'max']
+
+# groupings of the days known to voms_peaks, by name
+VOMS_GROUPINGS = {
+    'month': lambda VOMS: VOMS.dates.to_period('M').astype(str),
+    'quarter': lambda VOMS: VOMS.dates.to_period('Q').astype(str),
+    'year': lambda VOMS: VOMS.dates.year,
+    'service_change': lambda VOMS: VOMS.service_change_id,
+    'service_type': lambda VOMS: VOMS.service_type,
+    'day_of_week': lambda VOMS: VOMS.day_of_week,
+}
+
+
+def daily_voms(df_VOMS, ls_route_str, df_service_change = None):
+    """The vehicles of every route and day of the VOMS table (as read_inputs returns it) as a ServiceMatrix.
+
+    The service type of a day is the one of the VOMS table, its service change comes from the
+    windows of `df_service_change` (NaN outside every window, or without it). The system
+    VOMS of a day is daily_total().
+    """
+
+    dates = pd.DatetimeIndex(df_VOMS['Date'])
+    if df_service_change is None:
+        service_change_id = pd.array([pd.NA] * len(dates), dtype = 'Int64')
+    else:
+        service_change_id = service_change_of_dates(df_VOMS['Date'], df_service_change).astype('Int64').array
+
+    return ServiceMatrix(dates, ls_route_str, df_VOMS[ls_route_str].to_numpy(), dates.day_name(),
+                         df_VOMS['Service Type'], service_change_id)
+
+
+def _window_days(dates, windows):
+    """(day, window) positions of every day of `dates` in every window of the IntervalIndex `windows`."""
+
+    dates = np.asarray(dates, dtype = 'datetime64[ns]')[:, None]
+    left = np.asarray(windows.left, dtype = 'datetime64[ns]')
+    right = np.asarray(windows.right, dtype = 'datetime64[ns]')
+    inside = ((dates >= left) if windows.closed_left else (dates > left)) & \
+             ((dates <= right) if windows.closed_right else (dates < right))
+
+    return np.nonzero(inside)
+
+
+def voms_peaks(VOMS, by = 'month', routes = False):
+    """Peak VOMS of the daily VOMS matrix (see daily_voms) over a grouping of the days, in one groupby.
+
+    `by` is a name of VOMS_GROUPINGS, an array with the group of every day, a pd.IntervalIndex
+    of custom date windows, or a list of those. Windows may overlap: a day in several windows
+    counts in each of them, and a day outside every window is left out.
+    Returns one row per group with the number of days, the peak of the system VOMS ('VOMS')
+    and, with `routes`, the peak of every route.
+    """
+
+    rows = np.arange(len(VOMS)) # the day of every row grouped, days repeat in overlapping windows
+    keys = []
+    for grouping in (by if isinstance(by, list) else [by]):
+        if isinstance(grouping, pd.IntervalIndex): # e.g. pd.IntervalIndex.from_arrays(starts, ends, closed = 'both')
+            day, window = _window_days(VOMS.dates[rows], grouping)
+            rows = rows[day]
+            keys = [(values[day], name) for values, name in keys]
+            keys.append((pd.Categorical.from_codes(window, grouping), 'window'))
+        elif isinstance(grouping, str):
+            keys.append((np.asarray(VOMS_GROUPINGS[grouping](VOMS))[rows], grouping))
+        else:
+            keys.append((np.asarray(grouping)[rows], None))
+
+    df = pd.DataFrame({'VOMS': VOMS.values.sum(axis = 1)[rows]})
+    if routes:
+        df = pd.concat([df, pd.DataFrame(VOMS.values[rows], columns = VOMS.routes)], axis = 1)
+    grouped = df.groupby([pd.Series(values, name = name) for values, name in keys], observed = True)
+
+    peaks = grouped.max()
+    peaks.insert(0, 'days', grouped.size())
+
+    return peaks
+
+
+def _rollup(metric, values, total, dates, service_change_id, service_type, ls_route_str):
+    """Days, sum and maximum of a days x routes block and its daily total by month, service change and service type."""
+
+    keys = pd.MultiIndex.from_arrays([pd.DatetimeIndex(dates).to_period('M').astype(str),
+                                      np.asarray(service_change_id, dtype = float),
+                                      np.asarray(service_type).astype(str)],
+                                     names = ['year_month', 'service_change_id', 'service_type'])
+    df = pd.DataFrame(values, index = keys, columns = pd.Index(ls_route_str, name = 'route'))
+    df[ALL_ROUTES] = np.asarray(total)
+
+    grouped = df.groupby(level = [0, 1, 2], dropna = False, sort = False) # days outside every service change are kept
+    days = grouped.count()
+
+    # one row per (group, route), built from the flat blocks rather than with DataFrame.stack
+    groups, routes = days.shape
+    stats = days.index.to_frame(index = False).loc[np.repeat(np.arange(groups), routes)].reset_index(drop = True)
+    stats.insert(0, 'route', np.tile(days.columns.to_numpy(), groups))
+    stats['metric'] = metric
+    stats['days'] = days.to_numpy().ravel()
+    stats['sum'] = grouped.sum().to_numpy().ravel()
+    stats['max'] = grouped.max().to_numpy().ravel()
+
+    return stats
+
+
+def rollup_cube(ls_route_str, matrices = None, df_ridership = None, VOMS = None, df_service_change = None):
+    """Build the rollup cube: one row per route (and 'All'), month, service change, service type and metric.
+
+    - matrices: dict of ServiceMatrix by metric name, e.g. {'VRM': VRM, 'Sched VRM': sched_VRM}
+    - df_ridership: adds 'UPT', by the Service Type of the ridership table
+    - VOMS: the daily VOMS matrix (see daily_voms) or the VOMS table, adds 'VOMS' by the Service Type
+      of the VOMS table; 'max' of 'All' is the peak of the daily totals
+    - df_service_change: gives the service change of the ridership and VOMS table dates (else empty)
+
+    'days' counts the days with a value, 'sum' and 'max' are over those days.
+    """
+
+    ls_cube = []
+    for metric, matrix in (matrices or {}).items():
+        ls_cube.append(_rollup(metric, matrix.values, matrix.values.sum(axis = 1), matrix.dates,
+                               matrix.service_change_id, matrix.service_type, ls_route_str))
+
+    def service_changes(dates):
+        if df_service_change is None:
+            return np.full(len(dates), np.nan)
+        return service_change_of_dates(dates, df_service_change).to_numpy()
+
+    if df_ridership is not None:
+        ls_cube.append(_rollup('UPT', df_ridership[ls_route_str].to_numpy(dtype = float), df_ridership['Total'],
+                               df_ridership['Date'], service_changes(df_ridership['Date']),
+                               df_ridership['Service Type'], ls_route_str))
+
+    if VOMS is not None:
+        if not isinstance(VOMS, ServiceMatrix):
+            VOMS = daily_voms(VOMS, ls_route_str, df_service_change)
+        ls_cube.append(_rollup('VOMS', VOMS.values, VOMS.values.sum(axis = 1), VOMS.dates,
+                               VOMS.service_change_id, VOMS.service_type, ls_route_str))
+
+    cube = pd.concat(ls_cube, ignore_index = True)[CUBE_COLUMNS]
+    cube['service_change_id'] = cube['service_change_id'].astype('Int64')
+
+    return cube
+
+
+def _system(cube, metric):
+    """The 'All' rows of one metric."""
+
+    return cube[(cube['route'] == ALL_ROUTES) & (cube['metric'] == metric)]
+
+
+def _whole_numbers(values):
+    return bool((values.dropna() % 1 == 0).all())
+
+
+def mr20_from_cube(cube):
+    """Build the MR-20 table from the rollup cube: monthly UPT, VRM, VRH and VOMS."""
+
+    # Sum ridership, VRM and VRH by month; the months are those of the ridership table
+    df_upt = _system(cube, 'UPT').groupby('year_month', sort = False)['sum'].sum()
+    MR20 = pd.DataFrame({'UPT': df_upt.astype(np.int64) if _whole_numbers(df_upt) else df_upt})
+    for metric in ['VRM', 'VRH']:
+        MR20[metric] = _system(cube, metric).groupby('year_month')['sum'].sum()
+
+    # Maximum VOMS by month
+    MR20['VOM'] = _system(cube, 'VOMS').groupby('year_month')['max'].max()
+
+    MR20 = MR20.sort_index()
+    MR20.index = pd.PeriodIndex(MR20.index, freq = 'M', name = 'year_month')
+    MR20 = MR20.reset_index()
+    if _whole_numbers(MR20['VOM']) and MR20['VOM'].notna().all():
+        MR20['VOM'] = MR20['VOM'].astype(np.int64)
+    MR20 = MR20.round({"VRM":2, "VRH":2})
+
+    return MR20
+
+
+def mr20(df_ridership, VRM, VRH, df_VOMS, ls_route_str):
+    """Build the MR-20 table: monthly UPT, VRM, VRH and VOMS."""
+
+    return mr20_from_cube(rollup_cube(ls_route_str, {'VRM': VRM, 'VRH': VRH}, df_ridership, df_VOMS))
+
+
+def service_change_of_dates(dates, df_service_change):
+    """Service Change ID of every date from the Change Date / End Date windows (NaN outside every window)."""
+
+    windows = pd.IntervalIndex.from_arrays(df_service_change['Change Date'], df_service_change['End Date'], closed = 'both')
+    if windows.is_overlapping:
+        raise ValueError('Service changes overlap in 2_Service Changes.xlsx')
+
+    position = windows.get_indexer(dates)
+    change_ids = df_service_change['Service Change ID'].to_numpy()
+
+    return pd.Series(np.where(position >= 0, change_ids[position], np.nan), index = dates.index)
+
+
+def service_change_voms_from_cube(cube, df_service_change):
+    """Count the days and find the maximum VOMS by service type within each service change, from the rollup cube."""
+
+    # days and maximum VOMS of every (service change, service type)
+    grouped = _system(cube, 'VOMS').groupby(['service_change_id', 'service_type']).agg(
+        size = ('days', 'sum'), max = ('max', 'max')).unstack('service_type')
+    grouped = grouped.reindex(df_service_change['Service Change ID'].to_numpy())
+
+    def column(stat, service_type):
+        if (stat, service_type) not in grouped.columns: # no day of this service type
+            return np.zeros(len(grouped), dtype = int) if stat == 'size' else np.full(len(grouped), np.nan)
+        values = grouped[(stat, service_type)]
+        if stat == 'size':
+            return values.fillna(0).astype(int).to_numpy()
+        return values.astype(int).to_numpy() if values.notna().all() and _whole_numbers(values) else values.to_numpy()
+
+    def date_text(dates): # e.g. 10/1/2021
+        return [f'{d.month}/{d.day}/{d.year}' for d in dates]
+
+    return pd.DataFrame({'Service Change ID': df_service_change['Service Change ID'].to_numpy(),
+                         'Change Date': date_text(df_service_change['Change Date']),
+                         'End Date': date_text(df_service_change['End Date']),
+                         'Weekdays': column('size', 'Weekday'),
+                         'Sat': column('size', 'Saturday'),
+                         'Sun': column('size', 'Sunday'),
+                         'Atypical': column('size', 'Atypical'),
+                         'WD VOMS': column('max', 'Weekday'),
+                         'SA VOMS': column('max', 'Saturday'),
+                         'SU VOMS': column('max', 'Sunday')})
+
+
+def service_change_voms(df_VOMS, df_service_change, ls_route_str):
+    """Count the days and find the maximum VOMS by service type within each service change."""
+
+    cube = rollup_cube(ls_route_str, VOMS = df_VOMS, df_service_change = df_service_change)
+
+    return service_change_voms_from_cube(cube, df_service_change)
+
+
+def average_voms(df_sc):
+    """Average Weekday, Saturday and Sunday VOMS weighted by the days of each service change."""
+
+    avg_WD_VOMS = round(np.sum(df_sc['Weekdays'] * df_sc['WD VOMS'])/(np.sum(df_sc['Weekdays'])), 2)
+    avg_SA_VOMS = round(np.sum(df_sc['Sat'] * df_sc['SA VOMS'])/(np.sum(df_sc['Sat'])), 2)
+    avg_SU_VOMS = round(np.sum(df_sc['Sun'] * df_sc['SU VOMS'])/(np.sum(df_sc['Sun'])), 2)
+
+    df_VOMS_data = {'Service Type': ['Atypical', 'Saturday', 'Sunday', 'Weekday', 'Annual'],
+                    'Average VOMS': ['N/A', avg_SA_VOMS, avg_SU_VOMS, avg_WD_VOMS, 'N/A']}
+
+    return pd.DataFrame(df_VOMS_data)
+
+
+# S-10 rows from the rollup cube: (row name, metric, statistic of the service type columns)
+S10_ROWS = [
+    ('Total Actual Vehicle Miles', 'TVM', 'mean'),
+    ('Total Actual Vehicle Revenue Miles', 'VRM', 'mean'),
+    ('Total Actual Vehicle Hours', 'TVH', 'mean'),
+    ('Total Actual Vehicle Revenue Hours', 'VRH', 'mean'),
+    ('Total Scheduled Vehicle Revenue Miles', 'Sched VRM', 'mean'),
+    ('Average Unlinked Passenger Trips (UPT)', 'UPT', 'mean'),
+    ('Total Unlinked Passenger Trips (UPT)', 'UPT', 'sum'),
+    ('Days Operated', 'UPT', 'count'),
+]
+
+
+def s10_from_cube(cube, df_sc):
+    """Build the S-10 table from the rollup cube and the service change VOMS."""
+
+    # daily means, sums and day counts of every metric by service type
+    df_system = cube[cube['route'] == ALL_ROUTES]
+    stats = df_system.groupby(['metric', 'service_type'])[['sum', 'days']].sum()
+    stats['mean'] = stats['sum'] / stats['days']
+    stats['count'] = stats['days']
+    annual = stats.groupby(level = 'metric')[['sum', 'count']].sum()
+
+    service_types = [st for st in S10_COLUMNS if st != 'Annual']
+    service_types = [st for st in service_types if st in stats.loc['TVM'].index] # the service types of the actual service
+
+    # ridership counts stay whole numbers in the sums
+    integer_metrics = ['UPT'] if _whole_numbers(stats.loc['UPT', 'sum']) else []
+
+    rows = {'Service Type': {st: st for st in service_types + ['Annual']}}
+    for row, metric, stat in S10_ROWS:
+        values = stats.loc[metric, stat]
+        annual_value = annual.loc[metric, 'count' if stat == 'count' else 'sum'] # the annual value is the total
+        if metric in integer_metrics or stat == 'count':
+            annual_value = int(annual_value)
+            values = values if stat == 'mean' else values.astype(int)
+        if stat == 'mean':
+            values = values.round(2) # The average of each service type
+            annual_value = round(annual_value, 2)
+
+        rows[row] = {st: values.get(st, np.nan) for st in service_types}
+        rows[row]['Annual'] = annual_value
+
+    # Deadhead miles/hours = Actual vehicle miles/hours - Acutal vehicle revenue miles/hours
+    not_available = {st: 'N/A' for st in service_types}
+    rows['Deadhead Miles'] = dict(not_available, Annual = round(annual.loc['TVM', 'sum'] - annual.loc['VRM', 'sum'], 2))
+    rows['Deadhead Hours'] = dict(not_available, Annual = round(annual.loc['TVH', 'sum'] - annual.loc['VRH', 'sum'], 2))
+    rows['Number of rows in Daily Ridership Sheet'] = dict(not_available, Annual = int(annual.loc['UPT', 'count']))
+
+    # average VOMS
+    df_VOMS = average_voms(df_sc).set_index('Service Type')['Average VOMS']
+    rows['Vehicles in Operation (VOMS)'] = {st: df_VOMS[st] for st in service_types + ['Annual']}
+
+    # Create final S-10
+    S_10 = pd.DataFrame.from_dict(rows, orient = 'index', dtype = object)
+    S_10 = S_10.rename(columns = S10_COLUMNS)
+    S_10 = S_10.reindex(columns = list(S10_COLUMNS.values()))
+
+    return S_10
+
+
+def s10(VRM, VRH, TVM, TVH, sched_VRM, df_ridership, df_sc):
+    """Build the S-10 table from the actual / scheduled service, the ridership and the service change VOMS."""
+
+    cube = rollup_cube([str(route) for route in VRM.routes],
+                       {'VRM': VRM, 'VRH': VRH, 'TVM': TVM, 'TVH': TVH, 'Sched VRM': sched_VRM}, df_ridership)
+
+    return s10_from_cube(cube, df_sc)
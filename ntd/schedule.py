@@ -0,0 +1,86 @@
+# Scheduled service: calendar templates and scheduled Vehicle Revenue Miles / Hours
+
+import numpy as np
+import pandas as pd
+
+from .matrix import DAYS_OF_WEEK, SERVICE_TYPES, ServiceMatrix
+
+
+# service type code of each day of week (Monday = 0): weekday, saturday or sunday
+SERVICE_TYPE_OF_DAY = np.array([0, 0, 0, 0, 0, 1, 2])
+
+
+def calendar_matrix(dates, change_ids, ls_route_str, dtype = np.float64):
+    """Create an empty service matrix with one row per date; the route values are NaN."""
+
+    dates = pd.DatetimeIndex(dates)
+    day_codes = dates.dayofweek.to_numpy()
+
+    return ServiceMatrix(dates, ls_route_str,
+                         np.full((len(dates), len(ls_route_str)), np.nan, dtype = dtype), # no values yet
+                         pd.Categorical.from_codes(day_codes, DAYS_OF_WEEK),
+                         pd.Categorical.from_codes(SERVICE_TYPE_OF_DAY[day_codes], SERVICE_TYPES),
+                         change_ids)
+
+
+def sched_table(change_date, end_date, ls_route_str):
+    """Create an empty Sched Miles/Hours table for the days from `change_date` to `end_date`."""
+
+    dates = pd.date_range(change_date, end_date, freq = 'D')
+    df_sched_table = calendar_matrix(dates, np.zeros(len(dates), dtype = int), ls_route_str).to_frame()
+
+    return df_sched_table.drop(columns = 'Service Change ID')
+
+
+def build_calendar(df_service_change, ls_route_str, dtype = np.float64):
+    """Create the empty service matrix of every service change of the reporting year at once."""
+
+    starts = df_service_change['Change Date'].to_numpy().astype('datetime64[D]')
+    ends = df_service_change['End Date'].to_numpy().astype('datetime64[D]')
+    lengths = np.maximum((ends - starts).astype(int) + 1, 0) # days of each service change
+
+    # day offset of every row within its service change
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    dates = np.repeat(starts, lengths) + offsets.astype('timedelta64[D]')
+    change_ids = np.repeat(df_service_change['Service Change ID'].to_numpy(), lengths)
+
+    return calendar_matrix(dates, change_ids, ls_route_str, dtype = dtype)
+
+
+def sched_lookup(matrix, df_sched_manual):
+    """Look up the weekly schedule value of every day and route of a service matrix.
+
+    `df_sched_manual` is one of the weekly-schedule tables (3_ to 6_) with one row per
+    (Service Change ID, Day of Week) and one column per route. Returns a days x routes array.
+    """
+
+    ls_route_str = matrix.routes
+
+    # melt the weekly schedule into a (Service Change ID, Day of Week, route) lookup
+    df_lookup = df_sched_manual.melt(id_vars = ['Service Change ID', 'Day of Week'],
+                                     var_name = 'Route', value_name = 'Value')
+    df_lookup = df_lookup.loc[df_lookup['Route'].isin(ls_route_str)]
+    df_lookup = df_lookup.drop_duplicates(['Service Change ID', 'Day of Week', 'Route'], keep = 'first') # same as value_list[0]
+
+    missing_routes = sorted(set(ls_route_str) - set(df_lookup['Route']), key = ls_route_str.index)
+    if missing_routes: # every route needs a column in the schedule
+        raise KeyError('Routes missing from the schedule table: ' + ', '.join(missing_routes))
+
+    # back to one row per (Service Change ID, Day of Week) with one column per route
+    df_lookup = df_lookup.pivot(index = ['Service Change ID', 'Day of Week'], columns = 'Route', values = 'Value')
+    df_lookup = df_lookup[ls_route_str]
+
+    # look up every day of the matrix at once
+    keys = pd.MultiIndex.from_arrays([np.asarray(matrix.service_change_id), np.asarray(matrix.day_of_week).astype(str)])
+    missing_keys = keys.difference(df_lookup.index)
+    if len(missing_keys) > 0: # every (service change, day of week) needs a row in the schedule
+        raise KeyError('Service Change ID / Day of Week missing from the schedule table: ' +
+                       ', '.join(str(key) for key in missing_keys))
+
+    return df_lookup.reindex(keys).to_numpy(dtype = matrix.values.dtype)
+
+
+def fill_sched_table(calendar, df_sched_manual):
+    """Fill an empty service matrix with the weekly schedule (3_Scheduled Miles / 4_Scheduled Hours)."""
+
+    return calendar.copy(values = sched_lookup(calendar, df_sched_manual))
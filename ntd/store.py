@@ -0,0 +1,288 @@
+# Daily route-level facts in a SQLite database
+#
+# A run can save its daily facts (actual and scheduled service, ridership and VOMS of every
+# route and day) to a SQLite file, under a dataset name such as the agency and mode. Saving
+# replaces the facts of the dataset within the dates of the run, so the years of a dataset
+# accumulate in one file. MR-20, 14_Service Changes VOMS and S-10 can be computed back from
+# the facts of any date range without the workbooks.
+#
+# Tables:
+# - route_day: dataset, date, route, service change, VRM, VRH, TVM, TVH, scheduled VRM, UPT, VOMS
+# - day: dataset, date, day of week, service change, service types, total UPT
+# - service_change: dataset, service change ID, change and end dates
+# - route: dataset, position, route (the column order of the routes, over every saved run)
+#
+# Dates are stored as 'YYYY-MM-DD' text.
+
+import argparse
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+from .excel import write_workbooks
+from .matrix import DAYS_OF_WEEK, SERVICE_TYPES, ServiceMatrix
+from .reports import rollup_cube, mr20_from_cube, service_change_voms_from_cube, s10_from_cube
+
+
+FACT_STORE = 'ntd_facts.sqlite'
+
+# the tables of run_stages and the inputs the facts are saved from
+FACT_TABLES = ['VRM', 'VRH', 'TVM', 'TVH', 'atypical_VRM', 'daily_VOMS']
+FACT_INPUTS = ['ridership', 'service_change']
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS route_day (
+    dataset TEXT NOT NULL,
+    date TEXT NOT NULL,
+    route TEXT NOT NULL,
+    service_change_id INTEGER,
+    vrm REAL, vrh REAL, tvm REAL, tvh REAL, sched_vrm REAL,
+    upt REAL,
+    voms INTEGER,
+    PRIMARY KEY (dataset, date, route)
+);
+CREATE INDEX IF NOT EXISTS route_day_route ON route_day (dataset, route, date);
+CREATE INDEX IF NOT EXISTS route_day_service_change ON route_day (dataset, service_change_id);
+
+CREATE TABLE IF NOT EXISTS day (
+    dataset TEXT NOT NULL,
+    date TEXT NOT NULL,
+    day_of_week TEXT,
+    service_change_id INTEGER,
+    service_type TEXT,
+    ridership_service_type TEXT,
+    voms_service_type TEXT,
+    upt INTEGER,
+    PRIMARY KEY (dataset, date)
+);
+CREATE INDEX IF NOT EXISTS day_service_change ON day (dataset, service_change_id);
+
+CREATE TABLE IF NOT EXISTS service_change (
+    dataset TEXT NOT NULL,
+    service_change_id INTEGER NOT NULL,
+    change_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    PRIMARY KEY (dataset, change_date)
+);
+
+CREATE TABLE IF NOT EXISTS route (
+    dataset TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    route TEXT NOT NULL,
+    PRIMARY KEY (dataset, route)
+);
+'''
+
+
+def connect(path):
+    """Open the fact store at `path`, creating its tables when needed."""
+
+    con = sqlite3.connect(path)
+    con.executescript(SCHEMA)
+
+    return con
+
+
+def _date_text(dates):
+    return pd.to_datetime(pd.Series(dates)).dt.strftime('%Y-%m-%d').to_numpy()
+
+
+def _per_route_day(df, dates, ls_route_str):
+    """Values of a per-date table (ridership, VOMS) aligned to dates x routes, NaN where missing."""
+
+    df = df.drop_duplicates('Date').set_index('Date').reindex(dates)
+
+    return df[ls_route_str].to_numpy(dtype = float)
+
+
+def save_facts(path, tables, inputs, dataset):
+    """Save the daily facts of a run (`tables` of run_stages and their `inputs`) as `dataset`.
+
+    The facts of `dataset` within the dates of the run are replaced.
+    """
+
+    VRM = tables['VRM']
+    ls_route_str = tables['routes']
+    dates = VRM.dates
+    first_day, last_day = _date_text([dates.min(), dates.max()])
+    days, routes = VRM.values.shape
+
+    date_text = _date_text(dates)
+    change_id = np.asarray(VRM.service_change_id).astype(np.int64)
+    VOMS = tables['daily_VOMS']
+    df_voms = pd.DataFrame(VOMS.values, index = VOMS.dates, columns = VOMS.routes).assign(
+        **{'Service Type': np.asarray(VOMS.service_type, dtype = object)})
+    df_voms = df_voms[~df_voms.index.duplicated()].reindex(dates)
+    voms = df_voms[ls_route_str].to_numpy(dtype = float)
+
+    df_route_day = pd.DataFrame({
+        'dataset': dataset,
+        'date': np.repeat(date_text, routes),
+        'route': np.tile(ls_route_str, days),
+        'service_change_id': np.repeat(change_id, routes),
+        'vrm': VRM.values.ravel(),
+        'vrh': tables['VRH'].values.ravel(),
+        'tvm': tables['TVM'].values.ravel(),
+        'tvh': tables['TVH'].values.ravel(),
+        'sched_vrm': tables['atypical_VRM'].values.ravel(),
+        'upt': _per_route_day(inputs['ridership'], dates, ls_route_str).ravel(),
+        'voms': pd.array(voms.ravel(), dtype = 'Int64')}) # no VOMS row: NULL
+
+    df_ridership = inputs['ridership'].drop_duplicates('Date').set_index('Date').reindex(dates)
+    df_day = pd.DataFrame({
+        'dataset': dataset,
+        'date': date_text,
+        'day_of_week': np.asarray(VRM.day_of_week).astype(str),
+        'service_change_id': change_id,
+        'service_type': np.asarray(VRM.service_type).astype(str),
+        'ridership_service_type': df_ridership['Service Type'].to_numpy(dtype = object),
+        'voms_service_type': df_voms['Service Type'].to_numpy(dtype = object),
+        'upt': pd.array(df_ridership['Total'].to_numpy(),
+                        dtype = 'Int64' if pd.api.types.is_integer_dtype(inputs['ridership']['Total']) else 'Float64')})
+
+    df_sc = pd.DataFrame({'dataset': dataset,
+                          'service_change_id': inputs['service_change']['Service Change ID'].to_numpy(),
+                          'change_date': _date_text(inputs['service_change']['Change Date']),
+                          'end_date': _date_text(inputs['service_change']['End Date'])})
+
+    con = connect(path)
+    with con: # one transaction: the dataset is replaced completely or not at all
+        for table in ['route_day', 'day']:
+            con.execute('DELETE FROM %s WHERE dataset = ? AND date BETWEEN ? AND ?' % table, (dataset, first_day, last_day))
+        con.execute('DELETE FROM service_change WHERE dataset = ? AND end_date >= ? AND change_date <= ?',
+                    (dataset, first_day, last_day))
+
+        df_route_day.to_sql('route_day', con, if_exists = 'append', index = False)
+        df_day.to_sql('day', con, if_exists = 'append', index = False)
+        df_sc.to_sql('service_change', con, if_exists = 'append', index = False)
+        # new routes go after the routes of the runs saved before
+        saved = pd.read_sql_query('SELECT route, position FROM route WHERE dataset = ?', con, params = (dataset,))
+        new_routes = [route for route in ls_route_str if route not in set(saved['route'])]
+        first = saved['position'].max() + 1 if len(saved) else 0
+        pd.DataFrame({'dataset': dataset, 'position': range(first, first + len(new_routes)), 'route': new_routes}).to_sql(
+            'route', con, if_exists = 'append', index = False)
+    con.close()
+
+
+def datasets(path):
+    """The datasets of the fact store with their first and last dates and number of routes."""
+
+    con = connect(path)
+    df = pd.read_sql_query('''SELECT d.dataset, MIN(d.date) AS first_day, MAX(d.date) AS last_day, COUNT(*) AS days,
+                                     (SELECT COUNT(*) FROM route r WHERE r.dataset = d.dataset) AS routes
+                              FROM day d GROUP BY d.dataset ORDER BY d.dataset''', con)
+    con.close()
+
+    return df
+
+
+def load_tables(path, dataset, start = None, end = None):
+    """Rebuild the tables the reports need from the facts of `dataset` between `start` and `end`.
+
+    Returns a dict like run_stages: 'routes', 'VRM', 'VRH', 'TVM', 'TVH', 'atypical_VRM', 'daily_VOMS'
+    and the input tables 'ridership' and 'service_change'.
+    """
+
+    start = '0000-00-00' if start is None else _date_text([start])[0]
+    end = '9999-99-99' if end is None else _date_text([end])[0]
+
+    con = connect(path)
+    ls_route_str = pd.read_sql_query('''SELECT route FROM route r WHERE dataset = ? AND EXISTS
+                                            (SELECT 1 FROM route_day f WHERE f.dataset = r.dataset AND f.route = r.route
+                                             AND f.date BETWEEN ? AND ?)
+                                        ORDER BY position''', con, params = (dataset, start, end))['route'].tolist()
+    df_day = pd.read_sql_query('SELECT * FROM day WHERE dataset = ? AND date BETWEEN ? AND ? ORDER BY date',
+                               con, params = (dataset, start, end))
+    df_facts = pd.read_sql_query('''SELECT date, route, vrm, vrh, tvm, tvh, sched_vrm, upt, voms FROM route_day
+                                    WHERE dataset = ? AND date BETWEEN ? AND ? ORDER BY date''',
+                                 con, params = (dataset, start, end))
+    df_sc = pd.read_sql_query('''SELECT service_change_id, change_date, end_date FROM service_change
+                                 WHERE dataset = ? AND end_date >= ? AND change_date <= ? ORDER BY change_date''',
+                              con, params = (dataset, start, end))
+    con.close()
+
+    if df_day.empty:
+        raise ValueError('No facts of dataset %r between %s and %s in %s' % (dataset, start, end, path))
+
+    dates = pd.DatetimeIndex(pd.to_datetime(df_day['date']))
+    position = pd.Index(ls_route_str).get_indexer(df_facts['route'])
+    row = pd.Index(df_day['date']).get_indexer(df_facts['date'])
+
+    def block(column, missing = 0.0): # routes without facts on a day (e.g. not run that year) had no service
+        values = np.full((len(dates), len(ls_route_str)), missing)
+        values[row, position] = df_facts[column].to_numpy(dtype = float)
+        return values
+
+    day_of_week = pd.Categorical(df_day['day_of_week'], categories = DAYS_OF_WEEK)
+    service_type = pd.Categorical(df_day['service_type'], categories = SERVICE_TYPES)
+    tables = {'routes': ls_route_str}
+    for name, column in [('VRM', 'vrm'), ('VRH', 'vrh'), ('TVM', 'tvm'), ('TVH', 'tvh'), ('atypical_VRM', 'sched_vrm')]:
+        tables[name] = ServiceMatrix(dates, ls_route_str, block(column), day_of_week, service_type,
+                                     df_day['service_change_id'].to_numpy())
+
+    calendar = pd.DataFrame({'Date': dates})
+    upt = block('upt', missing = np.nan)
+    tables['ridership'] = pd.concat([calendar.assign(**{'Service Type': df_day['ridership_service_type'],
+                                                        'Total': df_day['upt'].to_numpy()}),
+                                     pd.DataFrame(upt, columns = ls_route_str)], axis = 1)
+    voms_day = df_day['voms_service_type'].notna().to_numpy() # the days with a VOMS row
+    tables['daily_VOMS'] = ServiceMatrix(dates[voms_day], ls_route_str, block('voms')[voms_day].astype(np.int64),
+                                         day_of_week[voms_day], df_day['voms_service_type'][voms_day],
+                                         df_day['service_change_id'].to_numpy()[voms_day])
+    tables['service_change'] = pd.DataFrame({'Service Change ID': df_sc['service_change_id'],
+                                             'Change Date': pd.to_datetime(df_sc['change_date']),
+                                             'End Date': pd.to_datetime(df_sc['end_date'])})
+
+    return tables
+
+
+def reports_from_store(path, dataset, start = None, end = None):
+    """Rollup cube, MR-20, 14_Service Changes VOMS and S-10 of `dataset` between `start` and `end`, from the fact store."""
+
+    tables = load_tables(path, dataset, start, end)
+    matrices = {'VRM': tables['VRM'], 'VRH': tables['VRH'], 'TVM': tables['TVM'], 'TVH': tables['TVH'],
+                'Sched VRM': tables['atypical_VRM']}
+
+    reports = {'cube': rollup_cube(tables['routes'], matrices, tables['ridership'], tables['daily_VOMS'], tables['service_change'])}
+    reports['MR20'] = mr20_from_cube(reports['cube'])
+    reports['service_change_VOMS'] = service_change_voms_from_cube(reports['cube'], tables['service_change'])
+    reports['S10'] = s10_from_cube(reports['cube'], reports['service_change_VOMS'])
+
+    return reports
+
+
+def main(argv = None):
+    """Compute MR-20, 14_Service Changes VOMS and S-10 from the fact store. Returns the process exit code."""
+
+    parser = argparse.ArgumentParser(description = 'MR-20 and S-10 from the daily facts saved with --fact-store.')
+    parser.add_argument('fact_store', help = 'SQLite file of the facts')
+    parser.add_argument('--dataset', default = None, help = 'dataset to report on (default: list the datasets)')
+    parser.add_argument('--start', default = None, help = 'first date (YYYY-MM-DD, default: the first saved date)')
+    parser.add_argument('--end', default = None, help = 'last date (YYYY-MM-DD, default: the last saved date)')
+    parser.add_argument('-o', '--output-folder', default = None, help = 'also write the reports as workbooks to this folder')
+    args = parser.parse_args(argv)
+
+    if args.dataset is None:
+        print(datasets(args.fact_store))
+        return 0
+
+    reports = reports_from_store(args.fact_store, args.dataset, args.start, args.end)
+    print(reports['MR20'])
+    print()
+    print(reports['S10'])
+
+    if args.output_folder is not None:
+        write_workbooks({'MR-20.xlsx': (reports['MR20'], False, False),
+                         '14_Service Changes VOMS.xlsx': (reports['service_change_VOMS'], False, False),
+                         '15_Route Month Rollup.xlsx': (reports['cube'], False, False),
+                         'S-10.xlsx': (reports['S10'], True, True)}, args.output_folder)
+        print()
+        print('MR-20.xlsx and S-10.xlsx are saved in', args.output_folder)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
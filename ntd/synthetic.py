@@ -0,0 +1,121 @@
+# Synthetic input workbooks, for benchmarking and trying the pipeline without agency data
+#
+# The tables have the layout of the 0_ to 9_ input workbooks and are consistent with each
+# other: the same routes everywhere, service changes covering the whole date span, schedules
+# for every service change and day of week, and deviations on dates and routes that exist.
+
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .excel import write_workbooks
+from .inputs import INPUT_FILES, InputTables, normalize_inputs
+from .matrix import DAYS_OF_WEEK
+from .schedule import SERVICE_TYPE_OF_DAY
+
+
+SERVICE_TYPE_NAMES = np.array(['Weekday', 'Saturday', 'Sunday'])
+
+
+def _deviations(rng, dates, routes, n, sign):
+    """n added (sign 1) or lost (sign -1) run records on random dates and routes."""
+
+    hours = rng.gamma(2, 2, n).round(2)
+    miles = (hours * rng.uniform(8, 16, n)).round(2)
+    deadhead = rng.random(n) < 0.3 # most runs have no deadhead of their own
+
+    df = pd.DataFrame({'Date': dates[rng.integers(0, len(dates), n)],
+                       'Route': np.asarray(routes)[rng.integers(0, len(routes), n)],
+                       'Hours': sign * hours,
+                       'Miles': sign * miles,
+                       'Deadhead Hours': sign * np.where(deadhead, rng.uniform(0.1, 2, n), 0).round(2),
+                       'Deadhead Miles': sign * np.where(deadhead, rng.uniform(1, 40, n), 0).round(1)})
+
+    return df.sort_values(['Date', 'Route'], ignore_index = True)
+
+
+def synthetic_inputs(routes = 28, service_changes = 5, start = '2021-10-01', days = 365,
+                     lost_runs = 300, added_runs = 100, atypical_days = 9, seed = 0):
+    """Return consistent synthetic input tables as an InputTables bundle, normalized like read_inputs.
+
+    - routes: number of routes, numbered 5, 10, 15, ...
+    - service_changes: number of service changes, splitting the date span in equal windows
+    - start, days: first date and number of dates
+    - lost_runs, added_runs, atypical_days: number of deviation records
+    """
+
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods = days, freq = 'D')
+    ls_route = [5 * (i + 1) for i in range(routes)]
+    day_of_week = dates.dayofweek.to_numpy()
+    service_type = SERVICE_TYPE_NAMES[SERVICE_TYPE_OF_DAY[day_of_week]]
+
+    # service changes: equal windows over the date span
+    bounds = np.linspace(0, days, service_changes + 1).astype(int)
+    df_sc = pd.DataFrame({'Service Change ID': np.arange(1, service_changes + 1),
+                          'Change Date': dates[bounds[:-1]],
+                          'End Date': dates[bounds[1:] - 1]})
+    for prefix in ['WD', 'SA', 'SU']:
+        df_sc[prefix + ' VOMS'] = np.nan
+    for prefix, first, last in [('WD', 5, 22), ('SA', 5, 22), ('SU', 6, 21)]:
+        df_sc[prefix + ' Start Service'] = datetime.time(first, 0)
+        df_sc[prefix + ' End Service'] = datetime.time(last, rng.integers(0, 60))
+
+    # schedules: one row per service change and day of week, lighter on weekends,
+    # some routes without Sunday service
+    base_miles = rng.uniform(150, 1200, routes)
+    base_speed = rng.uniform(10, 18, routes)
+    no_sunday = rng.random(routes) < 0.2
+    scale = np.array([1, 1, 1, 1, 1, 0.8, 0.6])
+    df_key = pd.DataFrame({'Service Change ID': np.repeat(df_sc['Service Change ID'].to_numpy(), 7),
+                           'Day of Week': np.tile(DAYS_OF_WEEK, service_changes)})
+    change_factor = rng.uniform(0.9, 1.1, (service_changes, 1, routes))
+    miles = (base_miles * scale[None, :, None] * change_factor).reshape(-1, routes)
+    miles[np.tile(np.arange(7) == 6, service_changes)[:, None] & no_sunday[None, :]] = 0
+    hours = miles / base_speed
+    dh_factor = rng.uniform(0.02, 0.08, routes)
+
+    def per_route(values):
+        return pd.concat([df_key, pd.DataFrame(values.round(3), columns = ls_route)], axis = 1)
+
+    # atypical days: no service, recorded in the service change of their date
+    atypical = np.sort(rng.choice(days, size = min(atypical_days, days), replace = False))
+    service_type = service_type.astype(object)
+    service_type[atypical] = 'Atypical'
+    sc_of_day = np.searchsorted(bounds, np.arange(days), side = 'right')
+    df_atypical = pd.DataFrame({'Service Change ID': sc_of_day[atypical],
+                                'Date': dates[atypical],
+                                'Day of Week': dates[atypical].day_name(),
+                                'Type': 'NoService',
+                                'Note': 'Holiday'})
+
+    # ridership and VOMS, one row per date
+    df_calendar = pd.DataFrame({'Service Type': service_type,
+                                'Month': dates.strftime('%b'),
+                                'Date': dates})
+    riders = rng.poisson(base_miles / 4 * scale[day_of_week][:, None], (days, routes)).astype(float)
+    riders[(day_of_week == 6)[:, None] & no_sunday[None, :]] = np.nan
+    df_ridership = pd.concat([df_calendar.assign(Total = np.nansum(riders, axis = 1).astype(np.int64)),
+                              pd.DataFrame(riders, columns = ls_route)], axis = 1)
+    vehicles = rng.poisson(base_miles / 250 * scale[day_of_week][:, None], (days, routes))
+    vehicles[(day_of_week == 6)[:, None] & no_sunday[None, :]] = 0
+    df_voms = pd.concat([df_calendar, pd.DataFrame(vehicles, columns = ls_route)], axis = 1)
+
+    return normalize_inputs(InputTables(
+        voms = df_voms,
+        ridership = df_ridership,
+        service_change = df_sc,
+        sched_miles = per_route(miles),
+        sched_hours = per_route(hours),
+        deadhead_miles = per_route(miles * dh_factor),
+        deadhead_hours = per_route(hours * dh_factor),
+        atypical = df_atypical,
+        added_runs = _deviations(rng, dates, ls_route, added_runs, 1),
+        lost_runs = _deviations(rng, dates, ls_route, lost_runs, -1)))
+
+
+def write_inputs(inputs, folder):
+    """Write input tables (e.g. from synthetic_inputs) as the 0_ to 9_ workbooks in `folder`."""
+
+    return write_workbooks({INPUT_FILES[name]: (df, False, False) for name, df in inputs.items()}, folder)
@@ -0,0 +1,184 @@
+# Checking the input tables before any stage runs
+#
+# Every check works on whole columns (set membership, joins), so the complete report of a
+# year of inputs takes a fraction of a second. Errors are inputs the stages cannot handle or
+# would silently get wrong; warnings are inputs that are unusual but handled. The tables are
+# checked as read_inputs returns them: values which did not convert to their type are empty.
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .inputs import INPUT_FILES, INPUT_SCHEMAS, ROUTES, RUN_SCHEMA, route_list
+from .matrix import DAYS_OF_WEEK
+from .schedule import build_calendar
+
+
+# columns the stages read, besides the routes
+REQUIRED_COLUMNS = {name: [col for col in schema if col != ROUTES] for name, schema in INPUT_SCHEMAS.items()}
+
+# tables with one row per (service change, day of week) and one column per route
+SCHEDULE_TABLES = ['sched_miles', 'sched_hours', 'deadhead_miles', 'deadhead_hours']
+
+# miles and hours of the added and lost runs
+RUN_VALUE_COLUMNS = [col for col, kind in RUN_SCHEMA.items() if kind == 'float']
+
+REPORT_COLUMNS = ['severity', 'workbook', 'check', 'count', 'examples']
+
+
+class InputError(ValueError):
+    """The input tables failed validation. `report` is the DataFrame of validate_inputs."""
+
+    def __init__(self, report):
+
+        self.report = report
+        errors = report[report['severity'] == 'error']
+        super().__init__('%d problems in the input workbooks:\n' % len(errors) + format_report(errors))
+
+    def __reduce__(self): # rebuilt from the report, e.g. when raised in a worker process
+        return (InputError, (self.report,))
+
+
+def format_report(report):
+    """One line per problem of a validation report."""
+
+    return '\n'.join('  -- [%s] %s: %s (%d, e.g. %s)' % tuple(row)
+                     for row in report[REPORT_COLUMNS].itertuples(index = False))
+
+
+def validate_inputs(inputs):
+    """Check the input tables (see read_inputs) and return the report of every problem found.
+
+    The report is a DataFrame with the columns severity ('error' or 'warning'), workbook,
+    check, count and examples; it is empty when the inputs are fine.
+    """
+
+    problems = []
+
+    def report(severity, name, check, values):
+        values = pd.Series(values).drop_duplicates()
+        if len(values):
+            problems.append((severity, INPUT_FILES[name], check, len(values),
+                             ', '.join(str(value) for value in values.iloc[:5])))
+
+    def rows(mask): # Excel row numbers, below the header row
+        return ['row %d' % (i + 2) for i in np.flatnonzero(mask)]
+
+    # columns
+    complete = {}
+    for name, columns in REQUIRED_COLUMNS.items():
+        missing = [col for col in columns if col not in inputs[name].columns]
+        report('error', name, 'missing columns', missing)
+        complete[name] = not missing
+        if complete[name] and 'Date' in columns:
+            report('error', name, 'dates that are empty or not dates', rows(inputs[name]['Date'].isna()))
+
+    if not complete['ridership']:
+        return pd.DataFrame(problems, columns = REPORT_COLUMNS)
+    ls_route_str = route_list(inputs['ridership'])
+
+    # routes: every route of the ridership table in every table with one column per route
+    for name in ['voms'] + SCHEDULE_TABLES:
+        df_routes = set(str(col) for col in inputs[name].columns)
+        report('error', name, 'routes of the ridership table missing', [r for r in ls_route_str if r not in df_routes])
+
+    if complete['voms']:
+        df_voms = inputs['voms']
+        values = df_voms[[r for r in ls_route_str if r in df_voms.columns]]
+        bad = values.isna() | (values % 1 != 0)
+        report('error', 'voms', 'vehicle counts that are empty or not whole numbers',
+               df_voms.loc[bad.any(axis = 1), 'Date'].dt.strftime('%Y-%m-%d'))
+
+    # service changes: valid, non-overlapping windows
+    calendar = None
+    if complete['service_change']:
+        df_sc = inputs['service_change']
+        starts, ends = df_sc['Change Date'], df_sc['End Date']
+        report('error', 'service_change', 'empty or non-numeric Service Change IDs', rows(df_sc['Service Change ID'].isna()))
+        report('error', 'service_change', 'duplicate Service Change IDs',
+               df_sc.loc[df_sc['Service Change ID'].duplicated(), 'Service Change ID'])
+        report('error', 'service_change', 'dates that are empty or not dates',
+               df_sc.loc[starts.isna() | ends.isna(), 'Service Change ID'])
+        report('error', 'service_change', 'End Date before Change Date', df_sc.loc[ends < starts, 'Service Change ID'])
+
+        valid = df_sc['Service Change ID'].notna() & starts.notna() & ends.notna() & (ends >= starts)
+        if valid.all() and not df_sc['Service Change ID'].duplicated().any():
+            order = np.argsort(starts.to_numpy())
+            overlap = starts.to_numpy()[order][1:] <= ends.to_numpy()[order][:-1]
+            report('error', 'service_change', 'windows overlapping the previous one',
+                   df_sc['Service Change ID'].to_numpy()[order][1:][overlap])
+            if not overlap.any():
+                calendar = build_calendar(df_sc, [])
+
+    if calendar is not None:
+        # dated rows outside every service change window
+        for name in ['voms', 'ridership', 'atypical', 'added_runs', 'lost_runs']:
+            if complete[name]:
+                df_dates = inputs[name]['Date'].dropna()
+                report('error', name, 'dates outside every service change window',
+                       df_dates[~df_dates.isin(calendar.dates)].dt.strftime('%Y-%m-%d'))
+        for name in ['voms', 'ridership']:
+            if complete[name]:
+                df_dates = inputs[name]['Date']
+                report('warning', name, 'duplicate dates', df_dates[df_dates.duplicated()].dt.strftime('%Y-%m-%d'))
+                report('warning', name, 'service change days without a row',
+                       calendar.dates[~calendar.dates.isin(df_dates)].strftime('%Y-%m-%d'))
+
+        # schedules: a row for every (service change, day of week) of the calendar
+        needed = pd.MultiIndex.from_arrays([np.asarray(calendar.service_change_id), np.asarray(calendar.day_of_week)]).unique()
+        for name in SCHEDULE_TABLES:
+            if complete[name]:
+                df = inputs[name]
+                keys = pd.MultiIndex.from_arrays([df['Service Change ID'], df['Day of Week']])
+                report('error', name, 'missing (Service Change ID, Day of Week) rows',
+                       ['(%s, %s)' % key for key in needed[~needed.isin(keys)]])
+                report('warning', name, 'duplicate (Service Change ID, Day of Week) rows, the first is used',
+                       ['(%s, %s)' % key for key in keys[keys.duplicated()]])
+
+    for name in SCHEDULE_TABLES:
+        if complete[name]:
+            report('error', name, 'unknown days of week',
+                   inputs[name].loc[~inputs[name]['Day of Week'].isin(DAYS_OF_WEEK), 'Day of Week'])
+
+    # added and lost runs
+    for name, sign in [('added_runs', 1), ('lost_runs', -1)]:
+        if complete[name]:
+            df = inputs[name]
+            report('error', name, 'routes not in the ridership table', df.loc[~df['Route'].isin(ls_route_str), 'Route'])
+            values = df[RUN_VALUE_COLUMNS]
+            report('error', name, 'empty or non-numeric miles / hours',
+                   df.loc[values.isna().any(axis = 1), 'Date'].dt.strftime('%Y-%m-%d'))
+            report('warning', name, 'miles / hours recorded with the wrong sign',
+                   df.loc[(values * sign < 0).any(axis = 1), 'Date'].dt.strftime('%Y-%m-%d'))
+
+    # atypical days and the service type of the ridership table
+    if complete['atypical']:
+        atypical_dates = inputs['atypical']['Date']
+        report('warning', 'atypical', 'duplicate dates', atypical_dates[atypical_dates.duplicated()].dt.strftime('%Y-%m-%d'))
+
+        df_ridership = inputs['ridership']
+        listed = df_ridership['Date'].isin(atypical_dates)
+        marked = df_ridership['Service Type'] == 'Atypical'
+        report('error', 'ridership', "atypical days whose Service Type is not 'Atypical'",
+               df_ridership.loc[listed & ~marked, 'Date'].dt.strftime('%Y-%m-%d'))
+        report('error', 'ridership', "'Atypical' days missing from 7_Atypical Days.xlsx",
+               df_ridership.loc[marked & ~listed, 'Date'].dt.strftime('%Y-%m-%d'))
+
+    return pd.DataFrame(problems, columns = REPORT_COLUMNS)
+
+
+def check_inputs(inputs):
+    """Validate the inputs: raise InputError listing every error, warn about the rest.
+
+    Returns the report of validate_inputs.
+    """
+
+    df_report = validate_inputs(inputs)
+
+    if (df_report['severity'] == 'error').any():
+        raise InputError(df_report)
+    if len(df_report):
+        warnings.warn('Unusual input tables:\n' + format_report(df_report))
+
+    return df_report
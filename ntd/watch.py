@@ -0,0 +1,136 @@
+# Watching the input folder and re-running the stages affected by a change
+#
+# The process stays up between runs and keeps the input tables, the stage results and the
+# output tables in memory. When a workbook is saved, only that workbook is read again, only
+# the stages reading it and the stages after them are recomputed (the others are loaded
+# from a MemoryStageCache), and only the output workbooks whose tables changed are written.
+#
+# The input workbooks are polled (modification time and size), which needs no extra package
+# and works on network drives. A change is picked up once the workbook has stayed the same
+# for `debounce` seconds, so the several writes of one Excel save (or several saves in a
+# row) make one run.
+
+import os
+import time
+
+from .cache import CACHE_FOLDER, MemoryStageCache
+from .export import EXPORT_SOURCES, export_tables
+from .excel import write_workbooks
+from .inputs import INPUT_FILES, InputTables, read_input
+from .instrument import StageProfiler
+from .pipeline import run_stages, output_workbooks
+from .validate import InputError, check_inputs
+
+
+# tables written before the others after a change
+REPORTS = ['MR20', 'S10', 'service_change_VOMS']
+
+
+def snapshot(folder):
+    """{input name: (modification time, size)} of the input workbooks of `folder`, None for a missing one."""
+
+    state = {}
+    for name, file_name in INPUT_FILES.items():
+        try:
+            stat = os.stat(os.path.join(folder, file_name))
+            state[name] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            state[name] = None
+
+    return state
+
+
+class InputWatcher:
+    """The inputs, stage results and outputs of an input folder, kept up to date by `refresh`."""
+
+    def __init__(self, input_folder, output_folder = None, dump_intermediates = False, validate = True,
+                 cache = True, workers = 1, export = None, verbose = True):
+
+        self.input_folder = input_folder
+        self.output_folder = input_folder if output_folder is None else output_folder
+        self.dump_intermediates = dump_intermediates
+        self.validate = validate
+        self.cache_folder = os.path.join(input_folder, CACHE_FOLDER) if cache else None
+        self.workers = workers
+        self.export = export
+        self.verbose = verbose
+
+        self.inputs = InputTables()
+        self.stage_cache = MemoryStageCache()
+        self.tables = {}
+
+    def log(self, *args):
+        if self.verbose:
+            print(*args)
+
+    def refresh(self, names = None):
+        """Read the inputs `names` (default: all) again, rerun the stages they affect and write the changed outputs.
+
+        Returns the names of the recomputed stages.
+        """
+
+        start = time.perf_counter()
+        for name in (INPUT_FILES if names is None else names):
+            self.inputs[name] = read_input(self.input_folder, name, self.cache_folder)
+        if self.validate:
+            check_inputs(self.inputs)
+
+        profiler = StageProfiler()
+        tables = run_stages(self.inputs, verbose = False, stage_cache = self.stage_cache, profiler = profiler)
+        df_profile = profiler.to_frame()
+        recomputed = df_profile.loc[~df_profile['cached'], 'stage'].tolist()
+        self.log('  -- recomputed', ', '.join(recomputed) or 'nothing', 'in', round(time.perf_counter() - start, 2), 's')
+
+        # the tables loaded from the stage cache are the same objects as before ('routes' is a new list every run)
+        changed = [name for name, table in tables.items() if name != 'routes' and self.tables.get(name) is not table]
+        self.tables = tables
+
+        # the small report workbooks first, they are the ones waited for
+        for names in [[name for name in REPORTS if name in changed], [name for name in changed if name not in REPORTS]]:
+            workbooks = output_workbooks(tables, self.dump_intermediates, names = names)
+            if workbooks:
+                write_workbooks(workbooks, self.output_folder, self.workers)
+                self.log('  -- wrote', ', '.join(workbooks), '-', round(time.perf_counter() - start, 2), 's')
+        if self.export and set(changed) & set(EXPORT_SOURCES):
+            export_tables(tables, self.output_folder, self.export)
+
+        return recomputed
+
+
+def watch(input_folder, output_folder = None, interval = 0.5, debounce = 1.0, **options):
+    """Run the pipeline on `input_folder`, then again on every change of an input workbook, until Ctrl+C.
+
+    The folder is polled every `interval` seconds, and a run starts once the changed workbooks
+    have stayed the same for `debounce` seconds. `options` are those of InputWatcher
+    (dump_intermediates, validate, cache, workers, export, verbose). A run that fails, e.g. on a
+    half saved workbook or an InputError, is reported and the watching goes on.
+    """
+
+    watcher = InputWatcher(input_folder, output_folder, **options)
+    state = snapshot(input_folder)
+    pending, ready_at = list(INPUT_FILES), 0 # the first run reads every input right away
+
+    watcher.log('* Watching', os.path.abspath(input_folder), 'for changes of the input workbooks, Ctrl+C to stop')
+    try:
+        while True:
+            if pending and time.monotonic() >= ready_at:
+                watcher.log('* Running every stage' if not watcher.tables else
+                            '* ' + ', '.join(INPUT_FILES[name] for name in pending) + ' changed')
+                try:
+                    watcher.refresh(pending)
+                    pending = []
+                except Exception as e: # e.g. a half saved workbook or an InputError: wait for the next save
+                    watcher.log(e if isinstance(e, InputError) else '  -- failed: %s: %s' % (type(e).__name__, e))
+                    ready_at = float('inf')
+
+            time.sleep(interval)
+            new_state = snapshot(input_folder)
+            changed = [name for name in INPUT_FILES if new_state[name] != state[name]]
+            if changed: # wait until the workbooks stay the same for `debounce` seconds
+                state = new_state
+                pending = list(dict.fromkeys(pending + changed))
+                ready_at = time.monotonic() + debounce
+    except KeyboardInterrupt:
+        watcher.log('* Stopped watching')
+
+    return watcher.tables
@@ -0,0 +1,37 @@
+# Fixtures on the bundled LeeTran workbooks (0_ to 9_ at the top of the repository)
+
+import os
+import shutil
+
+import pytest
+
+from ntd import INPUT_FILES, read_inputs, run_stages
+
+
+INPUT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope = 'session')
+def inputs():
+    """The input tables of the bundled workbooks, read once. Tests must not modify them."""
+
+    return read_inputs(INPUT_FOLDER)
+
+
+@pytest.fixture(scope = 'session')
+def tables(inputs):
+    """The result tables of every stage on the bundled workbooks."""
+
+    return run_stages(inputs, verbose = False)
+
+
+@pytest.fixture
+def input_folder(tmp_path):
+    """A copy of the bundled workbooks, free to edit."""
+
+    folder = tmp_path / 'inputs'
+    folder.mkdir()
+    for file_name in INPUT_FILES.values():
+        shutil.copy(os.path.join(INPUT_FOLDER, file_name), folder)
+
+    return str(folder)
@@ -0,0 +1,57 @@
+# Batch runs from a manifest
+
+import os
+
+import pandas as pd
+import pytest
+
+from ntd.batch import SUMMARY_FILE, main, read_manifest, run_batch
+from ntd.cache import read_excel_cached
+
+
+def write_manifest(folder, rows):
+    path = os.path.join(folder, 'manifest.csv')
+    pd.DataFrame(rows).to_csv(path, index = False)
+    return path
+
+
+def test_read_manifest(tmp_path):
+    path = write_manifest(str(tmp_path), {'input_folder': ['fy2022', '/data/fy2023'],
+                                          'output_folder': ['out/fy2022', None], 'agency': ['LeeTran'] * 2})
+    df = read_manifest(path)
+
+    assert df['name'].tolist() == ['fy2022', 'fy2023']
+    assert df['input_folder'].tolist() == [os.path.join(str(tmp_path), 'fy2022'), '/data/fy2023']
+    assert df['output_folder'].iloc[0] == os.path.join(str(tmp_path), 'out/fy2022') # relative to the manifest
+    assert pd.isna(df['output_folder'].iloc[1]) # <output root>/<name>
+    assert df['agency'].tolist() == ['LeeTran'] * 2
+
+
+@pytest.mark.parametrize('rows, message', [({'folder': ['a']}, 'no input_folder column'),
+                                           ({'input_folder': ['a', 'b'], 'name': ['x', 'x']}, 'unique')])
+def test_bad_manifest(tmp_path, rows, message):
+    with pytest.raises(ValueError, match = message):
+        read_manifest(write_manifest(str(tmp_path), rows))
+
+
+def test_failed_run_does_not_stop_the_batch(input_folder, tmp_path):
+    missing = str(tmp_path / 'missing')
+    path = write_manifest(str(tmp_path), {'input_folder': [input_folder, missing], 'name': ['ok', 'missing']})
+    output_root = str(tmp_path / 'batch_output')
+
+    df_summary = run_batch(path, output_root, workers = 2, verbose = False)
+
+    assert df_summary['status'].tolist() == ['ok', 'failed']
+    assert df_summary.loc[0, 'UPT'] == 2055465 and df_summary.loc[0, 'max_VOMS'] == 45
+    assert 'FileNotFoundError' in df_summary.loc[1, 'error']
+    assert os.path.exists(os.path.join(output_root, 'ok', 'MR-20.xlsx'))
+    assert os.path.exists(os.path.join(output_root, SUMMARY_FILE))
+    assert not os.path.exists(missing) # no cache folder made for the missing input folder
+
+    assert main([path, '-o', output_root, '-j', '2']) == 1
+
+
+def test_missing_workbook_makes_no_cache_folder(tmp_path):
+    with pytest.raises(OSError):
+        read_excel_cached(str(tmp_path / 'missing.xlsx'), str(tmp_path / 'cache'))
+    assert not os.path.exists(str(tmp_path / 'cache'))
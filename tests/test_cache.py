@@ -0,0 +1,95 @@
+# The input and stage cache: reuse, keys, atomic writes and the stages rerun after editing 9_Lost Runs.xlsx
+
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from ntd import CACHE_FOLDER, PROFILE_FILE, StageCache, read_excel_cached, run_pipeline
+
+
+def edit_lost_run(input_folder, miles):
+    """Set the Miles of the first lost run of 9_Lost Runs.xlsx."""
+
+    path = os.path.join(input_folder, '9_Lost Runs.xlsx')
+    workbook = openpyxl.load_workbook(path)
+    sheet = workbook.active
+    column = [cell.value for cell in sheet[1]].index('Miles') + 1
+    sheet.cell(row = 2, column = column).value = miles
+    workbook.save(path)
+
+
+def profiled_run(input_folder, output_folder, cache = True):
+    """MR-20 of a run and {stage: loaded from the cache} of its profile."""
+
+    tables = run_pipeline(input_folder, output_folder, verbose = False, cache = cache, profile = True)
+    df_profile = pd.read_csv(os.path.join(output_folder, PROFILE_FILE + '.csv'))
+
+    return tables['MR20'], dict(zip(df_profile['stage'], df_profile['cached']))
+
+
+def test_edit_reruns_only_the_stages_after_it(input_folder, tmp_path):
+    output_folder = str(tmp_path / 'outputs')
+
+    MR20, cached = profiled_run(input_folder, output_folder)
+    assert not any(cached.values())
+    assert os.path.isdir(os.path.join(input_folder, CACHE_FOLDER))
+
+    MR20_again, cached = profiled_run(input_folder, output_folder)
+    assert all(cached[stage] for stage in ['calendar', 'lost_runs', 'cube', 'mr20', 's10'])
+    pd.testing.assert_frame_equal(MR20_again, MR20)
+
+    edit_lost_run(input_folder, -500)
+    MR20_edited, cached = profiled_run(input_folder, output_folder)
+    recomputed = {stage for stage, from_cache in cached.items() if not from_cache}
+    assert recomputed == {'read_inputs', 'validate', 'write_outputs', 'lost_runs', 'added_runs', 'deadhead',
+                          'run_deadhead', 'revenue_cube', 'total_cube', 'cube', 'mr20', 's10'}
+
+    # the same as a run without the cache, with the 11.06 lost miles of the first run now 500
+    MR20_uncached, cached = profiled_run(input_folder, output_folder, cache = False)
+    pd.testing.assert_frame_equal(MR20_edited, MR20_uncached)
+    assert MR20['VRM'].sum() - MR20_edited['VRM'].sum() == pytest.approx(500 - 11.06, abs = 0.02)
+
+
+def test_stage_cache_keys(tmp_path):
+    stage_cache = StageCache(str(tmp_path))
+    key = stage_cache.key('calendar', ['a'], [])
+    assert key == stage_cache.key('calendar', ['a'], [])
+    assert key != stage_cache.key('calendar', ['b'], [])
+
+    stage_cache.save('calendar', key, {'calendar': pd.DataFrame({'x': [1, 2]})})
+    pd.testing.assert_frame_equal(stage_cache.load('calendar', key)['calendar'], pd.DataFrame({'x': [1, 2]}))
+    assert stage_cache.load('calendar', stage_cache.key('calendar', ['b'], [])) is None
+    assert stage_cache.load('schedule', key) is None
+    assert os.listdir(str(tmp_path)) == ['calendar.pkl'] # no temporary file left behind
+
+
+def test_failed_save_keeps_the_previous_results(tmp_path):
+    stage_cache = StageCache(str(tmp_path))
+    stage_cache.save('calendar', 'old', {'x': 1})
+
+    with pytest.raises(Exception):
+        stage_cache.save('calendar', 'new', {'x': lambda: None}) # cannot be pickled
+    assert stage_cache.load('calendar', 'old') == {'x': 1}
+    assert os.listdir(str(tmp_path)) == ['calendar.pkl']
+
+
+def test_read_excel_cached(input_folder, tmp_path):
+    path = os.path.join(input_folder, '2_Service Changes.xlsx')
+    cache_folder = str(tmp_path / 'cache')
+    calls = []
+    def reader(path):
+        calls.append(path)
+        return pd.read_excel(path)
+
+    df = read_excel_cached(path, cache_folder, reader)
+    pd.testing.assert_frame_equal(read_excel_cached(path, cache_folder, reader), df)
+    os.utime(path, (0, 0)) # touched, not changed
+    read_excel_cached(path, cache_folder, reader)
+    assert len(calls) == 1
+
+    read_excel_cached(path, cache_folder, reader, version = 2) # another reader
+    assert len(calls) == 2
+    assert not [name for name in os.listdir(cache_folder) if name.endswith('.tmp')]
+
@@ -0,0 +1,63 @@
+# Streamed output workbooks read back like DataFrame.to_excel writes them
+
+import os
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+import ntd.excel
+from ntd import table_rows, write_workbooks
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({'Date': pd.date_range('2021-10-01', periods = 7).strftime('%Y-%m-%d'),
+                         'year_month': pd.period_range('2021-10', periods = 7, freq = 'M'),
+                         '5': [1.5, np.nan, 3.25, 4.0, 5.0, 6.0, 7.0],
+                         'VOM': np.arange(7, dtype = np.int64),
+                         'Service Type': ['Weekday', None, 'Sunday', 'Weekday', 'Saturday', 'Weekday', 'Atypical']})
+
+
+def sheet_values(path, sheet = None):
+    workbook = openpyxl.load_workbook(path)
+    ws = workbook[sheet] if sheet else workbook.active
+    return [list(row) for row in ws.iter_rows(values_only = True)], ws
+
+
+@pytest.mark.parametrize('chunk_cells', [1, 12, 20000]) # records split over several chunks or in one
+def test_table_rows(df, monkeypatch, chunk_cells):
+    monkeypatch.setattr(ntd.excel, 'CHUNK_CELLS', chunk_cells)
+    rows = list(table_rows(df))
+
+    assert rows[0] == [None, 'Date', 'year_month', '5', 'VOM', 'Service Type']
+    assert rows[1] == [0, '2021-10-01', '2021-10', 1.5, 0, 'Weekday']
+    assert rows[2] == [1, '2021-10-02', '2021-11', None, 1, None]
+    assert len(rows) == 8
+    assert all(type(value) in (int, float, str, type(None)) for row in rows for value in row)
+
+
+def test_write_workbooks(df, tmp_path):
+    paths = write_workbooks({'MR-20.xlsx': (df, False, False), '10_VRM.xlsx': (df, True, True)}, str(tmp_path))
+    assert [os.path.basename(path) for path in paths] == ['MR-20.xlsx', '10_VRM.xlsx']
+
+    values, ws = sheet_values(paths[0])
+    assert values == [list(row) for row in table_rows(df, index = False)]
+
+    values, ws = sheet_values(paths[1])
+    assert values == [list(row) for row in table_rows(df)]
+    assert ws['B2'].alignment.horizontal == 'right' and ws['A2'].alignment.horizontal is None # records only
+    assert ws['B1'].alignment.horizontal is None
+
+
+def test_single_workbook_in_parallel(df, tmp_path):
+    workbooks = {'14_Service Changes VOMS.xlsx': (df, False, False), 'S-10.xlsx': (df.head(2), True, False)}
+
+    paths = write_workbooks(workbooks, str(tmp_path), workers = 2)
+    assert sorted(os.listdir(str(tmp_path))) == ['14_Service Changes VOMS.xlsx', 'S-10.xlsx']
+
+    paths = write_workbooks(workbooks, str(tmp_path / 'single'), single_workbook = 'NTD Outputs.xlsx')
+    assert openpyxl.load_workbook(paths[0]).sheetnames == ['14_Service Changes VOMS', 'S-10']
+    values, ws = sheet_values(paths[0], 'S-10')
+    assert len(values) == 3
@@ -0,0 +1,58 @@
+# Feather / Parquet export of the results with fixed schemas
+
+import os
+
+import numpy as np
+import pytest
+
+from ntd.export import EXPORT_FOLDER, EXPORT_TABLES, SCHEMA_VERSION, export_tables
+
+pa = pytest.importorskip('pyarrow')
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+
+@pytest.fixture(scope = 'module')
+def exported(tables, tmp_path_factory):
+    folder = str(tmp_path_factory.mktemp('export'))
+    return folder, export_tables(tables, folder)
+
+
+def test_files_read_back(exported):
+    folder, tables = exported
+    assert sorted(os.listdir(os.path.join(folder, EXPORT_FOLDER))) == \
+        sorted(name + ext for name in EXPORT_TABLES for ext in ['.feather', '.parquet'])
+
+    for name, table in tables.items():
+        path = os.path.join(folder, EXPORT_FOLDER, name)
+        assert feather.read_table(path + '.feather').equals(table), name
+        assert pq.read_table(path + '.parquet').schema.equals(table.schema), name
+        assert table.schema.metadata[b'ntd_schema_version'] == SCHEMA_VERSION.encode()
+        assert table.schema.metadata[b'ntd_table'] == name.encode()
+
+
+def test_row_counts(exported, tables):
+    folder, exported_tables = exported
+    routes = len(tables['routes'])
+    assert exported_tables['service_daily'].num_rows == 365 * routes
+    assert exported_tables['route_month_rollup'].num_rows == len(tables['cube'])
+    assert exported_tables['mr20'].num_rows == 12
+    assert exported_tables['s10'].num_rows == (len(tables['S10']) - 1) * tables['S10'].shape[1]
+
+
+def test_values(exported, tables):
+    folder, exported_tables = exported
+    df_mr20 = exported_tables['mr20'].to_pandas()
+    MR20 = tables['MR20']
+    for col, name in [('upt', 'UPT'), ('vrm', 'VRM'), ('vrh', 'VRH'), ('voms', 'VOM')]:
+        assert df_mr20[col].tolist() == pytest.approx(MR20[name].astype(float).tolist()), col
+
+    daily = exported_tables['service_daily']
+    assert np.allclose(daily['vrm'].to_numpy(), tables['VRM'].values.ravel())
+    assert daily['route'].type == pa.dictionary(pa.int32(), pa.string())
+
+
+def test_unknown_format(tables, tmp_path):
+    with pytest.raises(ValueError, match = 'csv'):
+        export_tables(tables, str(tmp_path), ['feather', 'csv'])
+    assert not os.path.exists(os.path.join(str(tmp_path), EXPORT_FOLDER))
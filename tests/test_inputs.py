@@ -0,0 +1,38 @@
+# Input workbooks read into tables of the types of INPUT_SCHEMAS
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from ntd import INPUT_FILES, INPUT_SCHEMAS, read_table
+from ntd.inputs import normalize_table
+
+from conftest import INPUT_FOLDER
+
+
+def test_read_table():
+    df = read_table(os.path.join(INPUT_FOLDER, INPUT_FILES['lost_runs']), 'lost_runs')
+    assert df.columns.tolist() == list(INPUT_SCHEMAS['lost_runs'])
+    assert pd.api.types.is_datetime64_any_dtype(df['Date'])
+    assert pd.api.types.is_string_dtype(df['Route'])
+    assert df['Route'].isin(['5', '10', '595']).any()
+
+
+def test_route_headers_are_strings():
+    df = normalize_table('voms', pd.DataFrame({'Service Type': ['Weekday'], 'Date': ['2021-10-01'], 5: [3],
+                                               10: [2.0], 'Unnamed: 3': [None]}))
+    assert df.columns.tolist() == ['Service Type', 'Date', '5', '10']
+    assert df['5'].dtype == np.int64
+
+
+def test_routes_of_runs_read_as_numbers():
+    df = normalize_table('lost_runs', pd.DataFrame({'Date': ['2021-10-01'] * 4, 'Route': [5.0, np.nan, 10.0, 12.5],
+                                                    'Hours': [-1.0] * 4, 'Miles': ['-2', 'x', -3, -4]}))
+    assert df['Route'].tolist()[::2] == ['5', '10'] # as the headers of the same routes
+    assert pd.isna(df['Route'].iloc[1]) and df['Route'].iloc[3] == '12.5'
+    assert df['Miles'].tolist()[::2] == [-2.0, -3.0] and np.isnan(df['Miles'].iloc[1])
+    assert 'Deadhead Miles' not in df.columns # missing columns are left out
+
+    df = normalize_table('added_runs', pd.DataFrame({'Route': ['5', '05', 'LINK']}))
+    assert df['Route'].tolist() == ['5', '05', 'LINK']
@@ -0,0 +1,64 @@
+# Profile of the stages: time, memory, size and cProfile statistics
+
+import json
+import os
+import pstats
+
+import pandas as pd
+import pytest
+
+from ntd import PROFILE_FILE, PROFILE_STAGES, StageProfiler, run_pipeline, table_size
+from ntd.instrument import max_rss_mb
+
+
+def test_table_size(tables):
+    df = pd.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]})
+    assert table_size(df) == (3, 6)
+    assert table_size(tables['VRM']) == (365, 365 * 27)
+    assert table_size({'x': df, 'y': [df, (df, 'text')], 'z': None}) == (9, 18)
+
+    pa = pytest.importorskip('pyarrow')
+    assert table_size(pa.Table.from_pandas(df, preserve_index = False)) == (3, 6)
+
+
+def test_max_rss_mb():
+    assert max_rss_mb() > 0
+
+
+def test_stage_profiler(tmp_path):
+    profiler = StageProfiler(profile_stage = 'build', trace_memory = True)
+    df = profiler.run('build', lambda n: pd.DataFrame({'x': range(n)}), 1000)
+    profiler.run('count', len, df, size_of = df)
+    profiler.note(cached = True)
+
+    assert len(df) == 1000
+    df_profile = profiler.write(str(tmp_path), input_folder = 'inputs')
+    assert df_profile['stage'].tolist() == ['build', 'count']
+    assert df_profile['cached'].tolist() == [False, True]
+    assert df_profile['rows'].tolist() == [1000, 1000]
+    assert (df_profile['peak_traced_mb'] >= 0).all()
+
+    with open(os.path.join(str(tmp_path), PROFILE_FILE + '.json')) as f:
+        profile = json.load(f)
+    assert profile['input_folder'] == 'inputs' and len(profile['stages']) == 2
+    assert os.path.exists(os.path.join(str(tmp_path), PROFILE_FILE + '.csv'))
+    pstats.Stats(os.path.join(str(tmp_path), 'build.prof')) # readable cProfile statistics
+
+
+def test_profiled_run(input_folder, tmp_path):
+    pytest.importorskip('pyarrow')
+    output_folder = str(tmp_path / 'outputs')
+
+    run_pipeline(input_folder, output_folder, verbose = False, profile = True, profile_stage = 'schedule',
+                 export = ['feather'], fact_store = str(tmp_path / 'facts.sqlite'))
+
+    df_profile = pd.read_csv(os.path.join(output_folder, PROFILE_FILE + '.csv'))
+    assert df_profile['stage'].tolist() == PROFILE_STAGES # every stage, in running order
+    assert (df_profile['cells'] > 0).all()
+    assert (df_profile['max_rss_mb'] > 0).all()
+    assert os.path.exists(os.path.join(output_folder, 'schedule.prof'))
+
+
+def test_unknown_profile_stage(input_folder):
+    with pytest.raises(ValueError, match = 'Unknown stage'):
+        run_pipeline(input_folder, verbose = False, profile_stage = 'nonexistent')
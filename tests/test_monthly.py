@@ -0,0 +1,59 @@
+# run_month gives the MR-20 row of the full year run, from the inputs of the month only
+
+import os
+
+import pandas as pd
+import pytest
+
+from ntd import MR20_HISTORY_FILE, InputError, InputTables, check_inputs, month_inputs, needed_stages, run_month
+from ntd.cli import main
+
+from conftest import INPUT_FOLDER
+
+
+@pytest.mark.parametrize('month', ['2021-11', '2022-03']) # 2021-11 spans two service changes
+def test_month_matches_full_year(tables, tmp_path, month):
+    df_history = run_month(INPUT_FOLDER, month, str(tmp_path), verbose = False)
+
+    full_year = tables['MR20'][tables['MR20']['year_month'].astype(str) == month]
+    assert len(df_history) == 1
+    for col in ['UPT', 'VRM', 'VRH', 'VOM']:
+        assert df_history[col].iloc[0] == pytest.approx(full_year[col].iloc[0]), col
+
+
+def test_history_keeps_one_row_per_month(tables, tmp_path):
+    for month in ['2022-03', '2021-10', '2022-03']:
+        run_month(INPUT_FOLDER, month, str(tmp_path), verbose = False)
+
+    df_history = pd.read_excel(os.path.join(str(tmp_path), MR20_HISTORY_FILE), dtype = {'year_month': str})
+    assert df_history['year_month'].tolist() == ['2021-10', '2022-03']
+
+
+@pytest.mark.parametrize('month, message', [('2022-13', 'YYYY-MM'), ('2030-01', 'No service change')])
+def test_bad_month_is_reported(tmp_path, capsys, month, message):
+    assert main([INPUT_FOLDER, '-o', str(tmp_path), '--month', month]) == 1
+    assert message in capsys.readouterr().out
+    assert not os.path.exists(os.path.join(str(tmp_path), MR20_HISTORY_FILE))
+
+
+def test_month_inputs(inputs):
+    sliced = month_inputs(inputs, '2021-11')
+    assert sliced['ridership']['Date'].dt.strftime('%Y-%m').unique().tolist() == ['2021-11']
+    assert sliced['service_change'].astype({'Change Date': str, 'End Date': str}).values.tolist() == \
+        [[1, '2021-11-01', '2021-11-20'], [2, '2021-11-21', '2021-11-30']]
+    assert sliced['sched_miles'] is inputs['sched_miles'] # per service change, kept whole
+
+
+def test_rows_without_a_date_are_checked(inputs):
+    copy = InputTables(inputs)
+    copy['lost_runs'] = inputs['lost_runs'].copy()
+    copy['lost_runs'].loc[3, 'Date'] = pd.NaT
+
+    with pytest.raises(InputError, match = 'dates that are empty or not dates'):
+        check_inputs(month_inputs(copy, '2022-03'))
+
+
+def test_mr20_does_not_need_deadhead():
+    stages = needed_stages(['mr20'])
+    assert 'mr20' in stages
+    assert not {'deadhead', 'run_deadhead', 'total_cube'} & set(stages)
@@ -0,0 +1,97 @@
+# Regression test: run_stages on the bundled workbooks gives the outputs of the original script
+
+import pytest
+
+
+ROUTES = ['5', '10', '15', '20', '30', '40', '50', '60', '70', '80', '100', '110', '120', '130', '140',
+          '150', '160', '240', '410', '420', '490', '500', '505', '515', '590', '595', '600']
+
+MR20 = [
+    ('2021-10', 134851, 244225.16, 15976.23, 38),
+    ('2021-11', 142565, 237708.49, 15970.52, 45),
+    ('2021-12', 202817, 259974.58, 18480.48, 45),
+    ('2022-01', 188471, 253006.95, 17983.4, 45),
+    ('2022-02', 214967, 238937.1, 16972.72, 45),
+    ('2022-03', 278565, 263754.29, 18811.18, 44),
+    ('2022-04', 226147, 248548.28, 17455.16, 45),
+    ('2022-05', 136464, 229042.28, 15131.51, 38),
+    ('2022-06', 133453, 233174.73, 15411.58, 37),
+    ('2022-07', 130828, 227846.25, 15054.22, 37),
+    ('2022-08', 147280, 243007.12, 16058.61, 37),
+    ('2022-09', 119057, 173067.61, 11377.39, 37),
+]
+
+S10 = {
+    'Service Type': ['Weekday', 'Saturday', 'Sunday', 'Atypical', 'Annual'],
+    'Total Actual Vehicle Miles': [9552.69, 8392.05, 3910.43, -2806.87, 3024065.3],
+    'Total Actual Vehicle Revenue Miles': [9014.47, 7941.9, 3642.4, -2653.67, 2852292.83],
+    'Total Actual Vehicle Hours': [647.06, 571.18, 271.35, -190.04, 205311.63],
+    'Total Actual Vehicle Revenue Hours': [613.57, 543.34, 255.63, -180.32, 194682.99],
+    'Total Scheduled Vehicle Revenue Miles': [9024.93, 7956.65, 3627.63, 0, 2878801.06],
+    'Average Unlinked Passenger Trips (UPT)': [6507.48, 5028.12, 2894.77, 70.22, 2055465],
+    'Total Unlinked Passenger Trips (UPT)': [1652899, 251406, 150528, 632, 2055465],
+    'Days Operated': [254, 50, 52, 9, 365],
+    'Deadhead Miles': ['N/A', 'N/A', 'N/A', 'N/A', 171772.46],
+    'Deadhead Hours': ['N/A', 'N/A', 'N/A', 'N/A', 10628.64],
+    'Number of rows in Daily Ridership Sheet': ['N/A', 'N/A', 'N/A', 'N/A', 365],
+    'Vehicles in Operation (VOMS)': [40.97, 35.8, 20.52, 'N/A', 'N/A'],
+}
+
+SERVICE_CHANGE_VOMS = [
+    (1, '10/1/2021', '11/20/2021', 36, 8, 7, 0, 38, 33, 18),
+    (2, '11/21/2021', '1/1/2022', 29, 4, 6, 3, 45, 40, 25),
+    (3, '1/2/2022', '2/25/2022', 40, 7, 8, 0, 45, 40, 25),
+    (4, '2/26/2022', '4/23/2022', 40, 9, 8, 0, 45, 40, 25),
+    (5, '4/24/2022', '9/30/2022', 112, 22, 23, 3, 38, 33, 17),
+]
+
+# 10_ to 13_: yearly total of every route, and the first day of the first three routes
+ROUTE_TOTALS = {
+    'VRM': [68245.55, 54346.29, 66844.69, 100020.08, 130205.41, 106420.52, 186804.86, 79663.86, 176937.22,
+            48857.69, 249049.20, 187473.22, 89081.22, 133926.51, 381658.71, 27554.10, 2247.00, 126918.02,
+            88419.03, 42951.32, 82508.71, 21578.09, 28723.22, 94685.50, 78652.32, 75087.01, 123433.48],
+    'VRH': [4357.68, 4587.41, 5417.03, 8427.42, 8898.40, 6066.36, 9653.58, 4523.41, 10880.15,
+            3103.05, 13713.10, 11206.32, 5071.57, 8396.88, 30546.37, 1591.09, 69.30, 9234.20,
+            5251.47, 6968.44, 10476.94, 2958.17, 2895.76, 5081.18, 5049.24, 5001.98, 5256.51],
+    'TVM': [69690.35, 56186.39, 70568.39, 102228.08, 135788.91, 120941.02, 191036.73, 85984.86, 190716.42,
+            52923.89, 264320.20, 194748.82, 90775.62, 138883.91, 406944.91, 35068.00, 2452.10, 131963.72,
+            102763.93, 43899.32, 92064.81, 22790.09, 29943.22, 105447.10, 80842.82, 76597.81, 128493.88],
+    'TVH': [4502.16, 4747.19, 5632.66, 8656.75, 9372.31, 6843.17, 9875.68, 4950.83, 11622.75,
+            3449.43, 14487.76, 11624.22, 5241.01, 8784.69, 32477.36, 1878.19, 80.36, 9754.44,
+            5806.16, 7159.56, 10886.34, 3083.74, 3022.19, 5464.70, 5177.12, 5109.98, 5620.90],
+}
+FIRST_DAY = {
+    'VRM': [228.666595, 178.93856, 191.005226],
+    'VRH': [14.5, 15.25, 15.75],
+    'TVM': [233.466595, 185.03856, 202.305226],
+    'TVH': [14.98, 15.78, 16.38],
+}
+
+
+def test_mr20(tables):
+    df = tables['MR20']
+    assert list(df.columns) == ['year_month', 'UPT', 'VRM', 'VRH', 'VOM']
+    assert list(zip(df['year_month'].astype(str), *(df[col] for col in ['UPT', 'VRM', 'VRH', 'VOM']))) == pytest.approx(MR20)
+
+
+def test_s10(tables):
+    df = tables['S10']
+    assert list(df.index) == list(S10)
+    for row, values in S10.items():
+        assert df.loc[row].tolist() == pytest.approx(values), row
+
+
+def test_service_change_voms(tables):
+    df = tables['service_change_VOMS']
+    assert list(df.itertuples(index = False, name = None)) == SERVICE_CHANGE_VOMS
+
+
+@pytest.mark.parametrize('name', list(ROUTE_TOTALS))
+def test_actual_service(tables, name):
+    matrix = tables[name]
+    assert list(matrix.routes) == ROUTES
+    assert len(matrix) == 365
+    assert str(matrix.dates[0].date()) == '2021-10-01' and str(matrix.dates[-1].date()) == '2022-09-30'
+    assert matrix.values.sum(axis = 0).tolist() == pytest.approx(ROUTE_TOTALS[name], abs = 0.01)
+    assert matrix.values[0, :3].tolist() == pytest.approx(FIRST_DAY[name])
+
@@ -0,0 +1,73 @@
+# The rollup cube: its sums match the daily matrices and the MR-20 / S-10 come from it
+
+import pandas as pd
+import pytest
+
+from ntd import InputTables, MemoryStageCache, StageProfiler, run_stages
+from ntd.reports import ALL_ROUTES, CUBE_COLUMNS, mr20, mr20_from_cube, rollup_cube
+
+
+CUBE_PARTS = ['revenue_cube', 'total_cube', 'sched_cube', 'upt_cube', 'voms_cube']
+
+
+def metric_sums(cube, metric):
+    """{route: sum} of one metric over every month, service change and service type."""
+
+    return cube[cube['metric'] == metric].groupby('route')['sum'].sum()
+
+
+def test_cube_is_the_parts_in_order(tables):
+    cube = tables['cube']
+    assert cube.columns.tolist() == CUBE_COLUMNS
+    assert len(cube) == sum(len(tables[name]) for name in CUBE_PARTS)
+    assert cube['metric'].unique().tolist() == ['VRM', 'VRH', 'TVM', 'TVH', 'Sched VRM', 'UPT', 'VOMS']
+    assert set(cube['route']) == set(tables['routes']) | {ALL_ROUTES}
+    assert cube['service_change_id'].dropna().unique().tolist() == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize('metric, matrix', [('VRM', 'VRM'), ('VRH', 'VRH'), ('TVM', 'TVM'), ('TVH', 'TVH'),
+                                            ('Sched VRM', 'atypical_VRM')])
+def test_sums_are_the_matrix_totals(tables, metric, matrix):
+    sums = metric_sums(tables['cube'], metric)
+    VRM = tables[matrix]
+    for position, route in enumerate(VRM.routes):
+        assert sums[route] == pytest.approx(VRM.values[:, position].sum()), route
+    assert sums[ALL_ROUTES] == pytest.approx(VRM.values.sum())
+
+
+def test_upt_and_voms(inputs, tables):
+    cube = tables['cube']
+    df_ridership = inputs['ridership']
+    sums = metric_sums(cube, 'UPT')
+    assert sums[ALL_ROUTES] == df_ridership['Total'].sum()
+    assert sums[tables['routes']].tolist() == pytest.approx(df_ridership[tables['routes']].sum().tolist())
+
+    df_voms = cube[(cube['metric'] == 'VOMS') & (cube['route'] == ALL_ROUTES)]
+    assert df_voms['days'].sum() == 365
+    assert df_voms['max'].max() == tables['daily_VOMS'].values.sum(axis = 1).max()
+
+
+def test_mr20_from_the_cube(inputs, tables):
+    pd.testing.assert_frame_equal(mr20_from_cube(tables['cube']), tables['MR20'])
+
+    cube = rollup_cube(tables['routes'], {'VRM': tables['VRM'], 'VRH': tables['VRH']}, inputs['ridership'],
+                       tables['daily_VOMS'])
+    pd.testing.assert_frame_equal(mr20_from_cube(cube), tables['MR20'])
+    pd.testing.assert_frame_equal(mr20(inputs['ridership'], tables['VRM'], tables['VRH'], inputs['voms'],
+                                       tables['routes']), tables['MR20'])
+
+
+def test_lost_run_change_keeps_the_other_cube_parts(inputs):
+    stage_cache = MemoryStageCache()
+    run_stages(inputs, verbose = False, stage_cache = stage_cache)
+
+    changed = InputTables(inputs)
+    changed['lost_runs'] = inputs['lost_runs'].assign(Miles = inputs['lost_runs']['Miles'] * 2)
+    profiler = StageProfiler()
+    tables = run_stages(changed, verbose = False, stage_cache = stage_cache, profiler = profiler)
+
+    df_profile = profiler.to_frame()
+    recomputed = df_profile.loc[~df_profile['cached'], 'stage'].tolist()
+    assert {'lost_runs', 'revenue_cube', 'total_cube', 'cube', 'mr20', 's10'} <= set(recomputed)
+    assert not {'sched_cube', 'upt_cube', 'voms_cube', 'service_change_voms'} & set(recomputed)
+    assert metric_sums(tables['cube'], 'VRM')[ALL_ROUTES] == pytest.approx(tables['VRM'].values.sum())
@@ -0,0 +1,36 @@
+# Reports from the SQLite fact store are those of the run that saved the facts
+
+import pandas as pd
+import pytest
+
+from ntd.store import datasets, reports_from_store, save_facts
+
+
+@pytest.fixture
+def fact_store(tables, inputs, tmp_path):
+    path = str(tmp_path / 'facts.sqlite')
+    save_facts(path, tables, inputs, 'leetran')
+    return path
+
+
+def test_round_trip(tables, fact_store):
+    df = datasets(fact_store)
+    assert df[['dataset', 'first_day', 'last_day', 'days', 'routes']].values.tolist() == \
+        [['leetran', '2021-10-01', '2022-09-30', 365, 27]]
+
+    reports = reports_from_store(fact_store, 'leetran')
+    for name in ['MR20', 'service_change_VOMS', 'S10']:
+        pd.testing.assert_frame_equal(reports[name], tables[name], check_dtype = False, obj = name)
+
+
+def test_date_range(tables, fact_store):
+    MR20 = reports_from_store(fact_store, 'leetran', '2022-01-01', '2022-03-31')['MR20']
+
+    full_year = tables['MR20'][tables['MR20']['year_month'].astype(str).between('2022-01', '2022-03')]
+    pd.testing.assert_frame_equal(MR20, full_year.reset_index(drop = True), check_dtype = False)
+
+
+def test_saving_again_replaces_the_dataset(tables, inputs, fact_store):
+    save_facts(fact_store, tables, inputs, 'leetran')
+
+    pd.testing.assert_frame_equal(reports_from_store(fact_store, 'leetran')['MR20'], tables['MR20'], check_dtype = False)
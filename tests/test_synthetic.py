@@ -0,0 +1,62 @@
+# Synthetic inputs and the stage benchmark
+
+import os
+
+import pandas as pd
+import pytest
+
+import ntd.benchmark
+from ntd import INPUT_FILES, read_inputs, run_stages, synthetic_inputs, validate_inputs, write_inputs
+from ntd.benchmark import compare, run_benchmark
+
+
+def test_synthetic_inputs_are_valid():
+    inputs = synthetic_inputs(routes = 12, service_changes = 3, days = 120, lost_runs = 50, added_runs = 20)
+
+    assert set(inputs) == set(INPUT_FILES)
+    assert (validate_inputs(inputs)['severity'] != 'error').all()
+    assert len(inputs['ridership']) == 120 and len(inputs['service_change']) == 3
+    assert len(inputs['lost_runs']) == 50 and len(inputs['added_runs']) == 20
+
+    tables = run_stages(inputs, verbose = False)
+    assert tables['VRM'].values.shape == (120, 12)
+    assert tables['MR20']['year_month'].astype(str).tolist() == ['2021-10', '2021-11', '2021-12', '2022-01']
+    assert len(tables['service_change_VOMS']) == 3
+
+
+def test_synthetic_inputs_follow_the_seed():
+    first, again, other = (synthetic_inputs(routes = 5, days = 60, seed = seed) for seed in [1, 1, 2])
+    for name in INPUT_FILES:
+        pd.testing.assert_frame_equal(first[name], again[name])
+    assert not first['lost_runs'].equals(other['lost_runs'])
+
+
+def test_written_inputs_read_back(tmp_path):
+    inputs = synthetic_inputs(routes = 5, service_changes = 2, days = 60, lost_runs = 10, added_runs = 5)
+    write_inputs(inputs, str(tmp_path))
+
+    assert sorted(os.listdir(str(tmp_path))) == sorted(INPUT_FILES.values())
+    read_back = read_inputs(str(tmp_path))
+    for name in INPUT_FILES:
+        pd.testing.assert_frame_equal(read_back[name], inputs[name], check_dtype = False, obj = name)
+
+
+def test_benchmark(tmp_path, monkeypatch):
+    monkeypatch.setitem(ntd.benchmark.SCALES, 'tiny', {'routes': 5, 'lost_runs': 20, 'added_runs': 5})
+    results_file = str(tmp_path / 'ntd_benchmark.csv')
+
+    df = run_benchmark(['tiny'], repeat = 2, label = 'before', results_file = results_file, verbose = False)
+    assert set(df['stage']) == {stage for stage, message, *rest in ntd.STAGES}
+    assert (df['scale'] == 'tiny').all() and (df['routes'] == 5).all()
+
+    df = run_benchmark(['tiny'], repeat = 1, excel = True, label = 'after', results_file = results_file, verbose = False)
+    assert {'write_inputs', 'read_inputs', 'write_outputs'} <= set(df['stage'])
+
+    df_compare = compare(['before', 'after'], results_file)
+    assert list(df_compare.columns) == ['before', 'after', 'ratio']
+    assert len(pd.read_csv(results_file)) == len(df) + len(ntd.STAGES)
+
+
+def test_unknown_scale():
+    with pytest.raises(SystemExit):
+        ntd.benchmark.main(['--scales', 'nonexistent'])
@@ -0,0 +1,73 @@
+# validate_inputs / check_inputs on broken copies of the bundled inputs
+
+import pandas as pd
+import pytest
+
+from ntd import InputError, InputTables, check_inputs, validate_inputs
+
+
+def broken(inputs, name, df):
+    """A copy of `inputs` with the table `name` replaced."""
+
+    copy = InputTables(inputs)
+    copy[name] = df
+    return copy
+
+
+def problems(report):
+    """{(severity, check): examples} of a validation report."""
+
+    return {(row.severity, row.check): row.examples for row in report.itertuples()}
+
+
+def test_bundled_inputs_are_valid(inputs):
+    assert validate_inputs(inputs).empty
+    assert check_inputs(inputs).empty
+
+
+def test_missing_column(inputs):
+    report = validate_inputs(broken(inputs, 'lost_runs', inputs['lost_runs'].drop(columns = 'Miles')))
+    assert problems(report) == {('error', 'missing columns'): 'Miles'}
+    assert report['workbook'].tolist() == ['9_Lost Runs.xlsx']
+
+
+def test_unknown_route_and_date_outside_service_changes(inputs):
+    df = inputs['added_runs'].copy()
+    df.loc[0, 'Route'] = '999'
+    df.loc[1, 'Date'] = pd.Timestamp('2023-01-15')
+    found = problems(validate_inputs(broken(inputs, 'added_runs', df)))
+    assert found[('error', 'routes not in the ridership table')] == '999'
+    assert found[('error', 'dates outside every service change window')] == '2023-01-15'
+
+
+def test_overlapping_service_changes(inputs):
+    df = inputs['service_change'].copy()
+    df.loc[1, 'Change Date'] = pd.Timestamp('2021-11-01') # inside service change 1
+    found = problems(validate_inputs(broken(inputs, 'service_change', df)))
+    assert found == {('error', 'windows overlapping the previous one'): '2'}
+
+
+def test_wrong_sign_is_a_warning(inputs):
+    df = inputs['lost_runs'].copy()
+    df.loc[0, 'Miles'] = 5.0 # lost runs take miles away
+    copy = broken(inputs, 'lost_runs', df)
+    with pytest.warns(UserWarning, match = 'wrong sign'):
+        report = check_inputs(copy)
+    assert report['severity'].tolist() == ['warning']
+
+
+def test_empty_deadhead_miles(inputs):
+    df = inputs['added_runs'].copy()
+    df.loc[2, 'Deadhead Miles'] = float('nan')
+    found = problems(validate_inputs(broken(inputs, 'added_runs', df)))
+    assert found == {('error', 'empty or non-numeric miles / hours'): df.loc[2, 'Date'].strftime('%Y-%m-%d')}
+
+
+def test_check_inputs_lists_every_error(inputs):
+    copy = broken(inputs, 'lost_runs', inputs['lost_runs'].assign(Route = '999'))
+    copy['voms'] = inputs['voms'].drop(columns = '5')
+    with pytest.raises(InputError) as raised:
+        check_inputs(copy)
+    report = raised.value.report
+    assert set(report['check']) == {'routes not in the ridership table', 'routes of the ridership table missing'}
+    assert '2 problems in the input workbooks' in str(raised.value)
@@ -0,0 +1,64 @@
+# voms_peaks over the groupings of VOMS_GROUPINGS and custom date windows
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ntd import voms_peaks
+
+
+def windows(starts, ends):
+    return pd.IntervalIndex.from_arrays(pd.to_datetime(starts), pd.to_datetime(ends), closed = 'both')
+
+
+@pytest.fixture(scope = 'module')
+def VOMS(tables):
+    return tables['daily_VOMS']
+
+
+@pytest.mark.parametrize('by, groups', [('month', 12), ('quarter', 4), ('year', 2), ('service_change', 5),
+                                        ('service_type', 4), ('day_of_week', 7)])
+def test_groupings_cover_every_day(VOMS, by, groups):
+    peaks = voms_peaks(VOMS, by)
+    assert len(peaks) == groups
+    assert peaks['days'].sum() == 365
+    assert peaks['VOMS'].max() == 45
+
+
+def test_month_is_the_mr20_vom(tables, VOMS):
+    peaks = voms_peaks(VOMS, 'month')
+    assert peaks.index.tolist() == tables['MR20']['year_month'].astype(str).tolist()
+    assert peaks['VOMS'].tolist() == tables['MR20']['VOM'].tolist()
+
+
+def test_service_change_and_type_is_the_service_change_voms(tables, VOMS):
+    peaks = voms_peaks(VOMS, ['service_change', 'service_type'])
+    df_sc = tables['service_change_VOMS'].set_index('Service Change ID')
+    for service_type, days, voms in [('Weekday', 'Weekdays', 'WD VOMS'), ('Saturday', 'Sat', 'SA VOMS'),
+                                     ('Sunday', 'Sun', 'SU VOMS')]:
+        type_peaks = peaks.xs(service_type, level = 'service_type')
+        assert type_peaks['days'].tolist() == df_sc[days].tolist()
+        assert type_peaks['VOMS'].tolist() == df_sc[voms].tolist()
+
+
+def test_route_peaks(VOMS):
+    peaks = voms_peaks(VOMS, np.zeros(len(VOMS), dtype = int), routes = True)
+    assert peaks.columns.tolist() == ['days', 'VOMS'] + list(VOMS.routes)
+    assert peaks.iloc[0, 2:].tolist() == VOMS.values.max(axis = 0).tolist()
+
+
+def test_windows_leave_out_other_days(VOMS):
+    peaks = voms_peaks(VOMS, windows(['2021-10-01', '2022-06-01'], ['2021-10-31', '2022-06-30']))
+    assert peaks['days'].tolist() == [31, 30]
+    assert peaks['VOMS'].tolist() == [voms_peaks(VOMS, 'month').loc[month, 'VOMS'] for month in ['2021-10', '2022-06']]
+
+
+def test_overlapping_windows(VOMS):
+    overlapping = windows(['2021-10-01', '2021-11-01'], ['2021-12-31', '2022-01-31'])
+    peaks = voms_peaks(VOMS, ['service_type', overlapping])
+
+    # every window gives what it gives on its own
+    for i in range(len(overlapping)):
+        alone = voms_peaks(VOMS, ['service_type', overlapping[i:i + 1]])
+        pd.testing.assert_frame_equal(peaks.xs(overlapping[i], level = 'window'), alone.xs(overlapping[i], level = 'window'))
+    assert peaks['days'].sum() == 92 + 92
@@ -0,0 +1,84 @@
+# InputWatcher reruns only the stages affected by a changed input and writes only the changed outputs
+
+import os
+import sys
+
+import pytest
+
+from ntd import INPUT_FILES, STAGES
+from ntd.cli import main
+from ntd.export import EXPORT_FOLDER
+from ntd.watch import InputWatcher, snapshot
+
+from conftest import INPUT_FOLDER
+
+
+def modification_times(folder):
+    """{file name: modification time} of the files of `folder` and its subfolders."""
+
+    times = {}
+    for root, dirs, files in os.walk(folder):
+        for file_name in files:
+            path = os.path.join(root, file_name)
+            times[os.path.relpath(path, folder)] = os.stat(path).st_mtime_ns
+
+    return times
+
+
+def test_snapshot(input_folder):
+    state = snapshot(input_folder)
+    assert set(state) == set(INPUT_FILES) and all(state.values())
+
+    os.remove(os.path.join(input_folder, INPUT_FILES['atypical']))
+    state = snapshot(input_folder)
+    assert state['atypical'] is None and state['voms'] is not None
+
+
+@pytest.fixture
+def watcher(inputs, tmp_path, monkeypatch):
+    """A watcher on the bundled workbooks, after its first refresh, whose lost_runs can be replaced."""
+
+    lost_runs = {'df': inputs['lost_runs']}
+    module = sys.modules['ntd.watch'] # ntd.watch is the watch function
+    read_input = module.read_input
+    monkeypatch.setattr(module, 'read_input', lambda folder, name, cache_folder = None:
+                        lost_runs['df'] if name == 'lost_runs' else read_input(folder, name, cache_folder))
+
+    watcher = InputWatcher(INPUT_FOLDER, str(tmp_path / 'outputs'), export = ['feather'], cache = False, verbose = False)
+    assert watcher.refresh() == [stage for stage, message, *rest in STAGES]
+    watcher.lost_runs = lost_runs
+
+    return watcher
+
+
+def test_unchanged_inputs(watcher):
+    written = modification_times(watcher.output_folder)
+    assert 'MR-20.xlsx' in written and os.path.join(EXPORT_FOLDER, 'mr20.feather') in written
+
+    tables = watcher.tables
+    assert watcher.refresh() == []
+    assert modification_times(watcher.output_folder) == written # no workbook or export written again
+    assert all(watcher.tables[name] is table for name, table in tables.items() if name != 'routes')
+
+
+def test_changed_lost_runs(watcher, inputs):
+    written = modification_times(watcher.output_folder)
+    df = inputs['lost_runs']
+    watcher.lost_runs['df'] = df.assign(Miles = df['Miles'] * 2)
+
+    recomputed = watcher.refresh(['lost_runs'])
+    assert {'lost_runs', 'revenue_cube', 'cube', 'mr20', 's10'} <= set(recomputed)
+    assert not {'schedule', 'upt_cube', 'voms_cube', 'service_change_voms'} & set(recomputed)
+
+    rewritten = {name for name, time in modification_times(watcher.output_folder).items() if written[name] != time}
+    assert {'MR-20.xlsx', 'S-10.xlsx', os.path.join(EXPORT_FOLDER, 'mr20.feather')} <= rewritten
+    assert '14_Service Changes VOMS.xlsx' not in rewritten
+
+
+@pytest.mark.parametrize('options, message', [(['--watch', '--month', '2022-01'], 'cannot be used together'),
+                                              (['--watch', '--profile'], '--watch cannot be used with --profile'),
+                                              (['--month', '2022-01', '--export', 'feather'], '--export')])
+def test_watch_options(capsys, options, message):
+    with pytest.raises(SystemExit):
+        main([INPUT_FOLDER] + options)
+    assert message in capsys.readouterr().err